@@ -3,7 +3,9 @@ AES master key generation along with encryption and decryption
 """
 
 import AESRoundFunc
+import os
 import random
+from concurrent.futures import ProcessPoolExecutor
 
 
 class InsufficientSamplesException(Exception):
@@ -106,51 +108,128 @@ def generateRoundKeys(
     return roundKeys
 
 
-def encrypt(msg: bytes, roundKeys: list[bytes]) -> bytes:
-    msg = __addPadding(msg, 16)
-    msg_blocks = [msg[i : i+16] for i in range(0, len(msg), 16)]
+class CipherContext:
+    """Holds the round keys generated by `generateRoundKeys` in word form (see AESRoundFunc.roundWords) along with
+    the round keys of the equivalent inverse cipher, so encrypting or decrypting any number of blocks does no key work.
 
-    cipher_blocks = []
+    Args:
+        roundKeys (list[bytes]): 16 byte round keys returned by `generateRoundKeys`
+    """
 
-    for block in msg_blocks:
-        state = AESRoundFunc.blockToState(block)
+    def __init__(self, roundKeys: list[bytes]) -> None:
+        self.roundKeys = [AESRoundFunc.blockToWords(roundKey) for roundKey in roundKeys]
+        self.invRoundKeys = [AESRoundFunc.invMixRoundKey(roundKey) for roundKey in self.roundKeys]
 
-        state = AESRoundFunc.addRoundKey(state, AESRoundFunc.blockToState(roundKeys[0]))
-        for i in range(1, len(roundKeys) - 1):
-            state = AESRoundFunc.subBytes(state)
-            state = AESRoundFunc.shiftRows(state)
-            state = AESRoundFunc.mixColumns(state)
-            state = AESRoundFunc.addRoundKey(state, AESRoundFunc.blockToState(roundKeys[i]))
+    def encryptBlock(self, block: bytes) -> bytes:
+        roundWords = AESRoundFunc.roundWords
+        roundKeys = self.roundKeys
 
-        state = AESRoundFunc.subBytes(state)
-        state = AESRoundFunc.shiftRows(state)
-        state = AESRoundFunc.addRoundKey(state, AESRoundFunc.blockToState(roundKeys[-1]))
-        cipher_blocks.append( AESRoundFunc.stateToBlock(state) )
-    
-    return b''.join(cipher_blocks)
+        words = [word ^ key for word, key in zip(AESRoundFunc.blockToWords(block), roundKeys[0])]
+        for roundKey in roundKeys[1:-1]:
+            words = roundWords(words, roundKey)
 
+        return AESRoundFunc.wordsToBlock(AESRoundFunc.finalRoundWords(words, roundKeys[-1]))
 
-def decrypt(cipherMsg: bytes, roundKeys: list[bytes]) -> bytes:
-    cipher_blocks = [cipherMsg[i : i+16] for i in range(0, len(cipherMsg), 16)]
-    msg_blocks = []
-    
-    for block in cipher_blocks:
-        state = AESRoundFunc.blockToState(block)
-
-        state = AESRoundFunc.addRoundKey(state, AESRoundFunc.blockToState(roundKeys[-1]) )
-        
-        for i in range(len(roundKeys) - 1, 0, -1):
-            state = AESRoundFunc.invShiftRows(state)
-            state = AESRoundFunc.invSubBytes(state)
-            state = AESRoundFunc.addRoundKey(state, AESRoundFunc.blockToState(roundKeys[i]) )
-            state = AESRoundFunc.invMixColumns(state)
-            
-        state = AESRoundFunc.invShiftRows(state)
-        state = AESRoundFunc.invSubBytes(state)
-        state = AESRoundFunc.addRoundKey(state, AESRoundFunc.blockToState(roundKeys[0]) )
-        msg_blocks.append( AESRoundFunc.stateToBlock(state) )
-
-    return __removePadding( b''.join(msg_blocks) )
+    def decryptBlock(self, block: bytes) -> bytes:
+        invRoundWords = AESRoundFunc.invRoundWords
+
+        words = [word ^ key for word, key in zip(AESRoundFunc.blockToWords(block), self.roundKeys[-1])]
+        for invRoundKey in self.invRoundKeys[:0:-1]:
+            words = invRoundWords(words, invRoundKey)
+
+        return AESRoundFunc.wordsToBlock(AESRoundFunc.invFinalRoundWords(words, self.roundKeys[0]))
+
+    def encryptBlocks(self, data: bytes) -> bytes:
+        """encrypts data whose length is a multiple of 16 bytes, no padding is added"""
+        return b"".join([self.encryptBlock(data[i : i+16]) for i in range(0, len(data), 16)])
+
+    def decryptBlocks(self, data: bytes) -> bytes:
+        """decrypts data whose length is a multiple of 16 bytes, no padding is removed"""
+        return b"".join([self.decryptBlock(data[i : i+16]) for i in range(0, len(data), 16)])
+
+
+def encrypt(msg: bytes, roundKeys: list[bytes]|CipherContext) -> bytes:
+    """encrypts the message after padding it to a multiple of 16 bytes,
+    pass a `CipherContext` instead of the round keys to reuse the expanded keys across messages"""
+    context = roundKeys if isinstance(roundKeys, CipherContext) else CipherContext(roundKeys)
+    return context.encryptBlocks(__addPadding(msg, 16))
+
+
+def decrypt(cipherMsg: bytes, roundKeys: list[bytes]|CipherContext) -> bytes:
+    """decrypts the cipher text and removes the padding,
+    pass a `CipherContext` instead of the round keys to reuse the expanded keys across messages"""
+    context = roundKeys if isinstance(roundKeys, CipherContext) else CipherContext(roundKeys)
+    return __removePadding(context.decryptBlocks(cipherMsg))
+
+
+def __ctrChunk(context: CipherContext, nonce: bytes, counter: int, data: bytes) -> bytes:
+    """XORs the data with the keystream blocks nonce || counter, nonce || counter + 1, ..."""
+    keystream = b"".join(
+        [context.encryptBlock(nonce + (counter + i).to_bytes(8, "big")) for i in range((len(data) + 15) // 16)]
+    )
+    return (int.from_bytes(data, "big") ^ int.from_bytes(keystream[:len(data)], "big")).to_bytes(len(data), "big")
+
+
+def __ctr(data: bytes, context: CipherContext, nonce: bytes, workers: int, chunkSize: int) -> bytes:
+    if len(nonce) != 8:
+        raise ValueError("nonce must be 8 bytes")
+    if chunkSize <= 0 or chunkSize % 16 != 0:
+        raise ValueError("chunkSize must be a positive multiple of 16 bytes")
+
+    # every chunk starts at its own counter, so the chunks can be processed in any order and on any process
+    offsets = range(0, len(data), chunkSize)
+    args = (
+        [context] * len(offsets),
+        [nonce] * len(offsets),
+        [offset // 16 for offset in offsets],
+        [data[offset : offset + chunkSize] for offset in offsets],
+    )
+
+    if workers <= 1 or len(offsets) <= 1:
+        return b"".join(map(__ctrChunk, *args))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return b"".join(executor.map(__ctrChunk, *args))
+
+
+def encryptCTR(
+    msg: bytes, roundKeys: list[bytes]|CipherContext, nonce: bytes|None = None, workers: int = 1, chunkSize: int = 2**16
+) -> tuple[bytes, bytes]:
+    """encrypts the message in counter mode, no padding is needed and the keystream blocks are independent,
+    so chunks of the message are encrypted in parallel on `workers` processes. The output does not depend on
+    `workers` or `chunkSize`.
+
+    Args:
+        msg (bytes): message to be encrypted
+        roundKeys (list[bytes] | CipherContext): round keys returned by `generateRoundKeys` or a context built from them
+        nonce (bytes | None, optional): 8 byte nonce, a random one is generated if None. Defaults to None.
+        workers (int, optional): number of processes to use, 1 encrypts in this process. Defaults to 1.
+        chunkSize (int, optional): bytes handed to a process at a time, must be a multiple of 16. Defaults to 64 KiB.
+
+    Returns:
+        tuple[bytes, bytes]: nonce and cipher text are returned as a tuple
+    """
+    context = roundKeys if isinstance(roundKeys, CipherContext) else CipherContext(roundKeys)
+    nonce = os.urandom(8) if nonce is None else nonce
+    return nonce, __ctr(msg, context, nonce, workers, chunkSize)
+
+
+def decryptCTR(
+    cipherMsg: bytes, roundKeys: list[bytes]|CipherContext, nonce: bytes, workers: int = 1, chunkSize: int = 2**16
+) -> bytes:
+    """decrypts the cipher text of `encryptCTR`, which is the same keystream XOR as encryption
+
+    Args:
+        cipherMsg (bytes): the byte sequence to be decrypted
+        roundKeys (list[bytes] | CipherContext): round keys used for encryption or a context built from them
+        nonce (bytes): nonce returned during encryption
+        workers (int, optional): number of processes to use, 1 decrypts in this process. Defaults to 1.
+        chunkSize (int, optional): bytes handed to a process at a time, must be a multiple of 16. Defaults to 64 KiB.
+
+    Returns:
+        bytes: decrypted message
+    """
+    context = roundKeys if isinstance(roundKeys, CipherContext) else CipherContext(roundKeys)
+    return __ctr(cipherMsg, context, nonce, workers, chunkSize)
     
 
 def __main():
@@ -137,6 +137,107 @@ def invSubBytes(state: list[list[bytes]]) -> list[list[bytes]]:
 ##################################################################################################
 
 
+################################ WORD (T-TABLE) STATE REPRESENTATION ###############################
+# Fast path of the functions above. The state is kept as four 32-bit words, word i holding row i of the
+# byte-grid with its first byte in the most significant position. Rows are independent of each other in this
+# cipher (shiftRows rotates within a row and mixColumns mixes within a row), so a whole round of a row is four
+# table lookups into tables combining subBytes (or invSubBytes) with mixColumns (or invMixColumns).
+
+def mixWord(a: int, b: int, c: int, d: int) -> tuple[int, int, int, int]:
+    """mixColumns of a single row, every byte is written back before the next one is computed just like `mixColumns`"""
+    a = gfp2[a] ^ gfp3[b] ^ c ^ d
+    b = gfp2[b] ^ gfp3[c] ^ a ^ d
+    c = gfp2[c] ^ gfp3[d] ^ a ^ b
+    d = gfp2[d] ^ gfp3[a] ^ b ^ c
+    return a, b, c, d
+
+
+def invMixWord(a: int, b: int, c: int, d: int) -> tuple[int, int, int, int]:
+    """invMixColumns of a single row, with the same in place update order as `invMixColumns`"""
+    a = gfp9[d] ^ gfp11[b] ^ gfp13[c] ^ gfp14[a]
+    b = gfp9[a] ^ gfp11[c] ^ gfp13[d] ^ gfp14[b]
+    c = gfp9[b] ^ gfp11[d] ^ gfp13[a] ^ gfp14[c]
+    d = gfp9[c] ^ gfp11[a] ^ gfp13[b] ^ gfp14[d]
+    return a, b, c, d
+
+
+def __bytesToWord(row: tuple[int, int, int, int]) -> int:
+    return (row[0] << 24) | (row[1] << 16) | (row[2] << 8) | row[3]
+
+
+# both mixes are linear, so the mix of a row is the XOR of the mixes of each byte on its own.
+# tBox[j][x] is the mixed row holding subBox[x] at position j and 0 elsewhere, invTBox the same for the inverse.
+tBox = [[__bytesToWord(mixWord(*(subBox[x] if k == j else 0 for k in range(4)))) for x in range(256)] for j in range(4)]
+invTBox = [[__bytesToWord(invMixWord(*(invSubBox[x] if k == j else 0 for k in range(4)))) for x in range(256)] for j in range(4)]
+
+
+def blockToWords(block: bytes) -> list[int]:
+    if len(block) != 16:
+        raise ValueError("[AESRoundFunc]: [blockToWords]: block size must be 16 bytes")
+    return [int.from_bytes(block[i : i + 4], "big") for i in range(0, 16, 4)]
+
+
+def wordsToBlock(words: list[int]) -> bytes:
+    return b"".join(word.to_bytes(4, "big") for word in words)
+
+
+def invMixRoundKey(roundKey: list[int]) -> list[int]:
+    """invMixColumns applied to a round key in word form. Since invMixColumns is linear, decryption can add this
+    key after invMixColumns instead of adding the round key before it (the equivalent inverse cipher)"""
+    return [__bytesToWord(invMixWord(*word.to_bytes(4, "big"))) for word in roundKey]
+
+
+def roundWords(words: list[int], roundKey: list[int]) -> list[int]:
+    """subBytes, shiftRows, mixColumns and addRoundKey in one go"""
+    t0, t1, t2, t3 = tBox
+    w0, w1, w2, w3 = words
+    k0, k1, k2, k3 = roundKey
+    # row i is rotated left by i bytes before mixing
+    return [
+        t0[w0 >> 24] ^ t1[(w0 >> 16) & 0xFF] ^ t2[(w0 >> 8) & 0xFF] ^ t3[w0 & 0xFF] ^ k0,
+        t0[(w1 >> 16) & 0xFF] ^ t1[(w1 >> 8) & 0xFF] ^ t2[w1 & 0xFF] ^ t3[w1 >> 24] ^ k1,
+        t0[(w2 >> 8) & 0xFF] ^ t1[w2 & 0xFF] ^ t2[w2 >> 24] ^ t3[(w2 >> 16) & 0xFF] ^ k2,
+        t0[w3 & 0xFF] ^ t1[w3 >> 24] ^ t2[(w3 >> 16) & 0xFF] ^ t3[(w3 >> 8) & 0xFF] ^ k3,
+    ]
+
+
+def finalRoundWords(words: list[int], roundKey: list[int]) -> list[int]:
+    """subBytes, shiftRows and addRoundKey of the last round"""
+    out = []
+    for i, (word, key) in enumerate(zip(words, roundKey)):
+        word = ((word << 8 * i) | (word >> (32 - 8 * i))) & 0xFFFFFFFF  # rotating left by i bytes
+        out.append(
+            (subBox[word >> 24] << 24 | subBox[(word >> 16) & 0xFF] << 16 | subBox[(word >> 8) & 0xFF] << 8 | subBox[word & 0xFF]) ^ key
+        )
+    return out
+
+
+def invRoundWords(words: list[int], invMixedRoundKey: list[int]) -> list[int]:
+    """invShiftRows, invSubBytes, addRoundKey and invMixColumns in one go, the round key must be passed through `invMixRoundKey`"""
+    t0, t1, t2, t3 = invTBox
+    w0, w1, w2, w3 = words
+    k0, k1, k2, k3 = invMixedRoundKey
+    # row i is rotated right by i bytes before mixing
+    return [
+        t0[w0 >> 24] ^ t1[(w0 >> 16) & 0xFF] ^ t2[(w0 >> 8) & 0xFF] ^ t3[w0 & 0xFF] ^ k0,
+        t0[w1 & 0xFF] ^ t1[w1 >> 24] ^ t2[(w1 >> 16) & 0xFF] ^ t3[(w1 >> 8) & 0xFF] ^ k1,
+        t0[(w2 >> 8) & 0xFF] ^ t1[w2 & 0xFF] ^ t2[w2 >> 24] ^ t3[(w2 >> 16) & 0xFF] ^ k2,
+        t0[(w3 >> 16) & 0xFF] ^ t1[(w3 >> 8) & 0xFF] ^ t2[w3 & 0xFF] ^ t3[w3 >> 24] ^ k3,
+    ]
+
+
+def invFinalRoundWords(words: list[int], roundKey: list[int]) -> list[int]:
+    """invShiftRows, invSubBytes and addRoundKey of the last round"""
+    out = []
+    for i, (word, key) in enumerate(zip(words, roundKey)):
+        word = ((word >> 8 * i) | (word << (32 - 8 * i))) & 0xFFFFFFFF  # rotating right by i bytes
+        out.append(
+            (invSubBox[word >> 24] << 24 | invSubBox[(word >> 16) & 0xFF] << 16 | invSubBox[(word >> 8) & 0xFF] << 8 | invSubBox[word & 0xFF]) ^ key
+        )
+    return out
+##################################################################################################
+
+
 def __main__():
     state = [
         [b"\x01", b"\x02", b"\x03", b"\x04"],
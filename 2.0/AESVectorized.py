@@ -0,0 +1,135 @@
+"""
+NumPy engine for the AES in AES.py, processing all the blocks of a message at once.
+The state of every block is a row of a (n_blocks, 4, 4) uint8 array laid out like `AESRoundFunc.blockToState`,
+every round function is a table gather or XOR over the whole array, and the output matches AES.py byte for byte.
+"""
+
+import numpy as np
+from AESMatrices import subBox, invSubBox, gfp2, gfp3, gfp9, gfp11, gfp13, gfp14
+
+SUB_BOX = np.array(subBox, dtype=np.uint8)
+INV_SUB_BOX = np.array(invSubBox, dtype=np.uint8)
+GFP2, GFP3 = np.array(gfp2, dtype=np.uint8), np.array(gfp3, dtype=np.uint8)
+GFP9, GFP11 = np.array(gfp9, dtype=np.uint8), np.array(gfp11, dtype=np.uint8)
+GFP13, GFP14 = np.array(gfp13, dtype=np.uint8), np.array(gfp14, dtype=np.uint8)
+
+# row i of the state is rotated left by i positions (right by i for the inverse)
+ROWS = np.arange(4)[:, None]
+SHIFT_ROWS = (np.arange(4)[None, :] + ROWS) % 4
+INV_SHIFT_ROWS = (np.arange(4)[None, :] - ROWS) % 4
+
+
+def __addPadding(data: bytes, block_size: int) -> bytes:
+    """pads the data with \x00 byte at end so that it is becomes a multiple of block_size where block_size is in bytes"""
+    return data + b"\x00" * (block_size - len(data) % block_size)
+
+
+def __removePadding(data: bytes) -> bytes:
+    """removes the trailing \x00 bytes at the end of the data"""
+    return data.rstrip(b"\x00")
+
+
+#################################### BLOCK - STATE CONVERSIONS ####################################
+def blocksToStates(data: bytes) -> np.ndarray:
+    if len(data) % 16 != 0:
+        raise ValueError("[AESVectorized]: [blocksToStates]: data size must be a multiple of 16 bytes")
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, 4, 4).copy()
+
+
+def statesToBlocks(states: np.ndarray) -> bytes:
+    return states.tobytes()
+
+
+def roundKeysToStates(roundKeys: list[bytes]) -> np.ndarray:
+    if any(len(roundKey) != 16 for roundKey in roundKeys):
+        raise ValueError("[AESVectorized]: [roundKeysToStates]: round key size must be 16 bytes")
+    return np.frombuffer(b"".join(roundKeys), dtype=np.uint8).reshape(-1, 4, 4)
+###################################################################################################
+
+
+########################################## ROUND FUNCTIONS ########################################
+def shiftRows(states: np.ndarray) -> np.ndarray:
+    return states[:, ROWS, SHIFT_ROWS]
+
+
+def invShiftRows(states: np.ndarray) -> np.ndarray:
+    return states[:, ROWS, INV_SHIFT_ROWS]
+
+
+def mixColumns(states: np.ndarray) -> np.ndarray:
+    # AESRoundFunc.mixColumns writes every byte of a row back before computing the next one,
+    # so the later bytes of the row are computed from the already mixed earlier ones
+    a, b, c, d = (states[:, :, i] for i in range(4))
+    a = GFP2[a] ^ GFP3[b] ^ c ^ d
+    b = GFP2[b] ^ GFP3[c] ^ a ^ d
+    c = GFP2[c] ^ GFP3[d] ^ a ^ b
+    d = GFP2[d] ^ GFP3[a] ^ b ^ c
+    return np.stack([a, b, c, d], axis=2)
+
+
+def invMixColumns(states: np.ndarray) -> np.ndarray:
+    # same in place update order as AESRoundFunc.invMixColumns
+    a, b, c, d = (states[:, :, i] for i in range(4))
+    a = GFP9[d] ^ GFP11[b] ^ GFP13[c] ^ GFP14[a]
+    b = GFP9[a] ^ GFP11[c] ^ GFP13[d] ^ GFP14[b]
+    c = GFP9[b] ^ GFP11[d] ^ GFP13[a] ^ GFP14[c]
+    d = GFP9[c] ^ GFP11[a] ^ GFP13[b] ^ GFP14[d]
+    return np.stack([a, b, c, d], axis=2)
+###################################################################################################
+
+
+def encrypt(msg: bytes, roundKeys: list[bytes]) -> bytes:
+    keys = roundKeysToStates(roundKeys)
+    states = blocksToStates(__addPadding(msg, 16))
+
+    states ^= keys[0]
+    for i in range(1, len(keys) - 1):
+        states = mixColumns(shiftRows(SUB_BOX[states]))
+        states ^= keys[i]
+
+    states = shiftRows(SUB_BOX[states])
+    states ^= keys[-1]
+    return statesToBlocks(states)
+
+
+def decrypt(cipherMsg: bytes, roundKeys: list[bytes]) -> bytes:
+    keys = roundKeysToStates(roundKeys)
+    states = blocksToStates(cipherMsg)
+
+    states ^= keys[-1]
+    for i in range(len(keys) - 1, 0, -1):
+        states = INV_SUB_BOX[invShiftRows(states)]
+        states ^= keys[i]
+        states = invMixColumns(states)
+
+    states = INV_SUB_BOX[invShiftRows(states)]
+    states ^= keys[0]
+    return __removePadding(statesToBlocks(states))
+
+
+def __main():
+    import AES
+    import os
+    import time
+
+    roundKeys = [os.urandom(16) for _ in range(11)]
+    message = os.urandom(16 * 2**10)
+
+    start = time.perf_counter()
+    cipherMsg = AES.encrypt(message, roundKeys)
+    plainMsg = AES.decrypt(cipherMsg, roundKeys)
+    print(f"AES.py: {2 * len(message) / (time.perf_counter() - start) / 2**20:.3f} MB/s")
+
+    start = time.perf_counter()
+    vectorizedCipherMsg = encrypt(message, roundKeys)
+    vectorizedPlainMsg = decrypt(cipherMsg, roundKeys)
+    print(f"AESVectorized.py: {2 * len(message) / (time.perf_counter() - start) / 2**20:.3f} MB/s")
+
+    if cipherMsg == vectorizedCipherMsg and plainMsg == vectorizedPlainMsg:
+        print("OUTPUT MATCHES AES.py!!")
+    else:
+        print("ERROR!!!!")
+
+
+if __name__ == "__main__":
+    __main()
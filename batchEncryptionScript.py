@@ -0,0 +1,124 @@
+"""
+Encrypts a whole directory of images or a manifest of items in one process, sharing the imports and the
+master key cache between the items and spreading them over a pool of worker processes.
+
+Manifests are JSONL files with one {"data_value": ..., "data_type": "text"|"image"|"image_file", "key": <optional>} object per line
+or CSV files with a data_value,data_type[,key] header. Every file of a directory is encrypted as an image,
+or as the image file itself with --image-files.
+
+Every finished item is appended to the results file as the response body of encryptionScript.py along with the
+"item" index and data_value of the item. Running the same command again skips the items that already succeeded,
+so an interrupted run resumes where it stopped.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+from typing import Iterator
+from module import Compression, Handlers, KeyStore
+from workerScript import initWorker, preloadModules, serveRequest
+
+
+def readItems(source: str, directoryType: str = "image") -> Iterator[dict]:
+    """yields the items of a directory, JSONL manifest or CSV manifest as encrypt requests"""
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            path = os.path.join(source, name)
+            if os.path.isfile(path):
+                yield {"data_value": path, "data_type": directoryType}
+    elif source.lower().endswith(".csv"):
+        with open(source, newline="") as manifest:
+            for row in csv.DictReader(manifest):
+                yield {"data_value": row["data_value"], "data_type": row["data_type"], "key": row.get("key") or None}
+    else:
+        with open(source) as manifest:
+            for line in manifest:
+                if line.strip():
+                    item = json.loads(line)
+                    yield {"data_value": item["data_value"], "data_type": item["data_type"], "key": item.get("key")}
+
+
+def readResults(resultsFileName: str) -> list[dict]:
+    """returns the results written by earlier runs, ignoring a last line cut off by an interruption"""
+    if not os.path.isfile(resultsFileName):
+        return []
+
+    results = []
+    with open(resultsFileName) as resultsFile:
+        for line in resultsFile:
+            try:
+                results.append(json.loads(line))
+            except json.JSONDecodeError:
+                pass
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Encrypts every item of a directory or JSONL/CSV manifest")
+    parser.add_argument("source", help="directory of images or .jsonl/.csv manifest")
+    parser.add_argument("--results", default="results.jsonl", help="JSONL file the results are appended to")
+    parser.add_argument("--key-mode", choices=["per-item", "shared"], default="per-item",
+                        help="generate a new key for every item without one or use a single key for all of them")
+    parser.add_argument("--key", help="existing key file or ks:<id> key store id to use for every item, implies --key-mode shared")
+    parser.add_argument("--image-files", action="store_true", help="encrypt the files of a directory verbatim instead of their decoded pixels")
+    parser.add_argument("--compress", metavar="CODEC[:LEVEL]", help="compress the payloads with this codec of module/Compression.py, e.g. zlib:1")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if not os.path.exists(args.source):
+        parser.error(f"{args.source} does not exist")
+
+    compression = {}
+    if args.compress:
+        codec, _, level = args.compress.partition(":")
+        try:
+            Compression.checkCodec(codec)
+        except ValueError as eobj:
+            parser.error(f"--compress: {eobj}")
+        if level and not level.lstrip("-").isdigit():
+            parser.error(f"--compress level must be an integer, not '{level}'")
+        compression = {"compression": codec, "compression_level": int(level) if level else None}
+
+    results = readResults(args.results)
+    done = {(result["item"], result["data_value"]) for result in results if result.get("success")}
+
+    sharedKey = args.key
+    if sharedKey is None and args.key_mode == "shared":
+        # an interrupted run keeps the key it started with
+        keys = [result["key"] for result in results if result.get("success")]
+        sharedKey = keys[0] if keys else Handlers.newKey(KeyStore.KeyStore.fromEnvironment())
+
+    requests = []
+    for index, item in enumerate(readItems(args.source, "image_file" if args.image_files else "image")):
+        if (index, item["data_value"]) in done:
+            continue
+        requests.append({"id": index, "action": "encrypt", **item, "key": sharedKey or item["key"], **compression})
+
+    dataValues = {request["id"]: request["data_value"] for request in requests}
+    print(f"{len(requests)} items to encrypt, {len(done)} already done", file=sys.stderr)
+
+    preloadModules()
+    failed = 0
+    with multiprocessing.Pool(args.workers, initializer=initWorker) as pool, open(args.results, "a+") as resultsFile:
+        # ending a line cut off by an interruption so the next result starts on its own line
+        if resultsFile.tell() > 0:
+            resultsFile.seek(resultsFile.tell() - 1)
+            if resultsFile.read(1) != "\n":
+                resultsFile.write("\n")
+
+        for responseBody in pool.imap_unordered(serveRequest, requests):
+            index = responseBody.pop("id")
+            failed += not responseBody["success"]
+            resultsFile.write(json.dumps({"item": index, "data_value": dataValues[index], **responseBody}) + "\n")
+            resultsFile.flush()
+
+    print(f"{len(requests) - failed} items encrypted, {failed} failed", file=sys.stderr)
+    exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Benchmarks of the key derivation, both AES implementations and the image container.
+
+Every benchmark is run `--repeat` times on fixed inputs and reported with its minimum and median time in seconds
+(and MB/s for the ones processing a payload). The results are written as JSON, which can be passed back as
+`--baseline` to a later run to report every benchmark whose median got slower by more than `--threshold`.
+
+    python benchmarkScript.py --output baseline.json
+    python benchmarkScript.py --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from functools import cache
+from typing import Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "2.0"))
+
+from module import AES, DoublePendulum  # noqa: E402
+import AES as AES2  # noqa: E402 the AES of 2.0/
+import AESVectorized  # noqa: E402
+
+KiB, MiB = 2**10, 2**20
+
+
+def measure(function: Callable[[], object], repeat: int) -> dict:
+    """returns the minimum and median time in seconds of `repeat` calls of `function`"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {"min": min(times), "median": statistics.median(times), "repeat": repeat}
+
+
+def benchmarks(imageDir: str) -> dict[str, tuple[Callable[[], Callable[[], object]], int]]:
+    """returns every benchmark by name as a factory of the function to time and the payload size in bytes (0 if none).
+    The inputs are only derived, encrypted or written once a factory needing them is called, so a run filtered down to
+    a few benchmarks does not pay for the setup of the others. The image container benchmarks write to `imageDir`"""
+    coordinates = cache(lambda: DoublePendulum.getCoordinates(total_samples=1001))  # x1, x2, y1, y2 as the keys take them
+    masterKey = cache(lambda: AES.masterKey(*coordinates()))
+    roundKeys = cache(lambda: AES2.generateRoundKeys(*coordinates()))
+    context = cache(lambda: AES2.CipherContext(roundKeys()))
+    message = cache(lambda size: random.Random(size).randbytes(size))
+    encrypted = cache(lambda size: AES.encrypt(message(size), masterKey()))
+    encrypted2 = cache(lambda size: AES2.encrypt(message(size), context()))
+    cases = {}
+
+    #------------------------------------------KEY DERIVATION------------------------------------------#
+    for total_time in (40, 100):
+        for total_samples in (100, 1001):
+            cases[f"getCoordinates/time={total_time}/samples={total_samples}"] = (
+                lambda total_time=total_time, total_samples=total_samples: lambda: DoublePendulum.getCoordinates(total_time, total_samples), 0
+            )
+    cases["getCoordinates/time=100/samples=1001/sparse"] = (
+        lambda: lambda: DoublePendulum.getCoordinates(100, 1001, sample_indices=AES.keySampleIndices(1001)), 0
+    )
+
+    def keyCase(generate: Callable) -> Callable[[], Callable[[], object]]:
+        def setup() -> Callable[[], object]:
+            x1, x2, y1, y2 = coordinates()
+            return lambda: generate(x1, x2, y1, y2)
+        return setup
+
+    cases["masterKey/samples=1001"] = (keyCase(AES.masterKey), 0)
+    cases["2.0/generateRoundKeys/samples=1001"] = (keyCase(AES2.generateRoundKeys), 0)
+    #------------------------------------------KEY DERIVATION------------------------------------------#
+
+    #---------------------------------------------ENCRYPTION-------------------------------------------#
+    for size in (KiB, 16 * KiB, 256 * KiB):
+        cases[f"module/encrypt/{size}"] = (lambda size=size: lambda msg=message(size), key=masterKey(): AES.encrypt(msg, key), size)
+        cases[f"module/decrypt/{size}"] = (
+            lambda size=size: lambda encrypted=encrypted(size), key=masterKey(): AES.decrypt(encrypted[1], key, encrypted[0]), size
+        )
+        cases[f"2.0/encrypt/{size}"] = (lambda size=size: lambda msg=message(size), context=context(): AES2.encrypt(msg, context), size)
+        cases[f"2.0/decrypt/{size}"] = (
+            lambda size=size: lambda cipherMsg=encrypted2(size), context=context(): AES2.decrypt(cipherMsg, context), size
+        )
+        cases[f"2.0/vectorized/encrypt/{size}"] = (
+            lambda size=size: lambda msg=message(size), roundKeys=roundKeys(): AESVectorized.encrypt(msg, roundKeys), size
+        )
+        cases[f"2.0/vectorized/decrypt/{size}"] = (
+            lambda size=size: lambda cipherMsg=encrypted2(size), roundKeys=roundKeys(): AESVectorized.decrypt(cipherMsg, roundKeys), size
+        )
+    #---------------------------------------------ENCRYPTION-------------------------------------------#
+
+    #-------------------------------------------IMAGE CONTAINER----------------------------------------#
+    def imageCase(size: int, ext: str, decrypt: bool) -> Callable[[], Callable[[], object]]:
+        def setup() -> Callable[[], object]:
+            msg, key, filename = message(size), masterKey(), os.path.join(imageDir, f"{size}.{ext}")
+            if not decrypt:
+                return lambda: AES.encryptToImage(msg, key, filename)
+            if not os.path.exists(filename):
+                AES.encryptToImage(msg, key, filename)
+            return lambda: AES.decryptFromImage(filename, key)
+        return setup
+
+    for size in (16 * KiB, 4 * MiB):
+        for ext in ("png", "pgm"):
+            cases[f"encryptToImage/{ext}/{size}"] = (imageCase(size, ext, decrypt=False), size)
+            cases[f"decryptFromImage/{ext}/{size}"] = (imageCase(size, ext, decrypt=True), size)
+    #-------------------------------------------IMAGE CONTAINER----------------------------------------#
+
+    return cases
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """returns a line for every benchmark whose median is more than `threshold` (a fraction) slower than in the baseline"""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["median"] / baseline[name]["median"]
+        if ratio > 1 + threshold:
+            regressions.append(f"{name}: {baseline[name]['median'] * 1000:.3f} ms -> {result['median'] * 1000:.3f} ms ({ratio:.2f}x)")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks the key derivation, the AES implementations and the image container")
+    parser.add_argument("--output", help="JSON file to write the results to, e.g. to use them as a baseline later")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown of the median reported as a regression. Defaults to 0.2 (20%%)")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed runs of every benchmark")
+    parser.add_argument("--filter", default="", help="only run the benchmarks whose name contains this text")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as imageDir:
+        for name, (setup, size) in benchmarks(imageDir).items():
+            if args.filter not in name:
+                continue
+
+            function = setup()
+            function()  # warm up, e.g. lazy imports and the sympy free equations of DoublePendulum
+            result = measure(function, args.repeat)
+            if size:
+                result["bytes"] = size
+                result["MBps"] = size / result["median"] / MiB
+            results[name] = result
+
+            throughput = f"{result['MBps']:>10.2f} MB/s" if size else ""
+            print(f"{name:<48}{result['median'] * 1000:>12.3f} ms{throughput}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as outputFile:
+            json.dump(report, outputFile, indent=2)
+    else:
+        print(json.dumps(report))
+
+    if args.baseline:
+        with open(args.baseline) as baselineFile:
+            regressions = compare(results, json.load(baselineFile)["results"], args.threshold)
+
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,73 +1,51 @@
-import json
 import sys
+
+#----------------------------------------------REPORTING THE IMPORT COST IF ASKED FOR-----------------------------------------------#
+if "--profile-startup" in sys.argv:
+    from module import Timing
+    sys.argv.remove("--profile-startup")
+    exit(Timing.profileStartup(sys.argv))
+#----------------------------------------------REPORTING THE IMPORT COST IF ASKED FOR-----------------------------------------------#
+
+# adding the time spent in every stage of the request to the response body if asked for
+timings = "--timings" in sys.argv
+if timings:
+    sys.argv.remove("--timings")
+
+# compressing the payload before encrypting it with --compress=<codec>[:<level>], e.g. --compress=zlib:1
+compression, compressionLevel = None, None
+for arg in [arg for arg in sys.argv[1:] if arg.startswith("--compress=")]:
+    sys.argv.remove(arg)
+    compression, _, level = arg.split("=", 1)[1].partition(":")
+    try:
+        compressionLevel = int(level) if level else None
+    except ValueError:
+        print(f"Error: Invalid Arguements\n--compress level must be an integer, not '{level}'\n[Usage]: {sys.argv[0]} <data_value> <data_type> [<key_file_name|ks:key_id>] [--compress=<codec>[:<level>]]")
+        exit(1)
+
 import os
-import requests
-from datetime import datetime
-from module import AES, DoublePendulum, Support
+from module import Handlers, KeyCache, KeyStore
 
 
 if len(sys.argv) <= 2:
-    print(f"Error: Missing Arguements\n[Usage]: {sys.argv[0]} <data_value> <data_type>")
+    print(f"Error: Missing Arguements\n[Usage]: {sys.argv[0]} <data_value> <data_type> [<key_file_name|ks:key_id>] [--profile-startup] [--timings] [--compress=<codec>[:<level>]]")
     exit(1)
     
 data_value = sys.argv[1]  # data to encrypt as text/imagepath
-data_type = sys.argv[2]  # data type text/image
+data_type = sys.argv[2]  # data type text/image/image_file
 
-ENCRYTED_IMAGE_DIR = "Encrypted"
-KEY_DIR = "Keys"
-
-if data_type == "image" and not os.path.isfile(data_value):
-    print(f"Error: Invalid Arguements\nArg[1] must be a image file for Arg[2] = 'image'")
+if data_type in ("image", "image_file") and not os.path.isfile(data_value):
+    print(f"Error: Invalid Arguements\nArg[1] must be a image file for Arg[2] = '{data_type}'")
     exit(1)
 
-#--------------------------CHECKING IF REQUIRED DIRECTORIES EXIST----------------------------#
-if not os.path.isdir(ENCRYTED_IMAGE_DIR):
-    os.mkdir(ENCRYTED_IMAGE_DIR)
-if not os.path.isdir(KEY_DIR):
-    os.mkdir(KEY_DIR)
-#--------------------------CHECKING IF REQUIRED DIRECTORIES EXIST----------------------------#
-
+keyFileName = sys.argv[3] if len(sys.argv) > 3 else None  # a new key is generated if missing
+keyStore = KeyStore.KeyStore.fromEnvironment()  # new keys are added to the KEY_STORE key store if set
 
-#----------------------------------------------CHECKING IF INITIAL CONDITIONS NEED TO BE GENERATED OR NOT-----------------------------------------------#
-if len(sys.argv) <= 3 or not os.path.isfile(sys.argv[3]):
-    keyFileName = f"./{KEY_DIR}/key_{datetime.now().timestamp()}"
-
-    total_time, total_samples, theta1_initial, theta2_intial, angularVelocity_initial_1, angular_velocity_initial_2, mass1, mass2, length_1, length_2, gravity = Support.generateInitialConditions()
-    Support.writeKey(keyFileName, total_time, total_samples, theta1_initial,  angularVelocity_initial_1, theta2_intial, angular_velocity_initial_2, mass1, mass2, length_1, length_2, gravity)
+if timings:
+    responseBody = Handlers.timeRequest(Handlers.encryptRequest, data_value, data_type, keyFileName, KeyCache.KeyCache.fromEnvironment(), keyStore, compression, compressionLevel)
 else:
-    keyFileName = sys.argv[3]
-    total_time, total_samples, theta1_initial, angularVelocity_initial_1, theta2_intial, angular_velocity_initial_2, mass1, mass2, length_1, length_2, gravity = Support.readKey(keyFileName)
-#----------------------------------------------CHECKING IF INITIAL CONDITIONS NEED TO BE GENERATED OR NOT-----------------------------------------------#
-
-
-x1, x2, y1, y2 = DoublePendulum.getCoordinates(total_time, int(total_samples), theta1_initial,  angularVelocity_initial_1, theta2_intial, angular_velocity_initial_2, mass1, mass2, length_1, length_2, gravity)
-
-masterKey = AES.masterKey(x1, x2, y1, y2)
-
-try:
-    if data_type == "text":
-        byteData = bytes([0]) + bytes(data_value, "utf-8")  # 0 to indicate type text
-        filename = ""
-    else:
-        byteData = bytes([1]) + Support.imageToBytes(data_value)
-        filename = data_value.rsplit(".", 1)[0].rsplit("/", 1)[-1]  # 1 to indicate type image and -1 to choose just the filename and not its path
-    
-    filename = f"./{ENCRYTED_IMAGE_DIR}/{filename}-{datetime.now().timestamp()}.png"
-    AES.encryptToImage(byteData, masterKey, filename)
-    
-    responseBody = {
-        "success": True,
-        "filepath": filename,
-        "key": keyFileName
-    }
-except Exception as eobj:
-        print(eobj)
-        responseBody = {
-            "success": False
-        }
-
+    responseBody = Handlers.encryptRequest(data_value, data_type, keyFileName, KeyCache.KeyCache.fromEnvironment(), keyStore, compression, compressionLevel)
 
 print(responseBody)
 
 # res = requests.post('http://127.0.0.1:3000/pythonRes', json=responseBody) 
-
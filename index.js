@@ -15,6 +15,76 @@ app.set("view engine", "ejs");
 app.set('views',path.join(__dirname,'views'));
 app.use('/static', express.static('static'))
 
+// Resident Python worker (workerScript.py) serving JSON-lines requests, started once instead of a process per request.
+// If it dies, the requests it was serving fail with status 500 and it is started again, meanwhile new requests get 503
+const WORKER_RESTART_DELAY = 1000;
+const pendingRequests = new Map();
+let pythonWorker = null;
+let nextRequestId = 0;
+
+function failPendingRequests(message) {
+    for (const [id, callback] of pendingRequests) {
+        callback({id: id, success: false, status: 500, message: message});
+    }
+    pendingRequests.clear();
+}
+
+function startWorker() {
+    const worker = spawn('python', ['workerScript.py', '--workers', process.env.PYTHON_WORKERS || '2']);
+    let workerOutput = '';
+
+    worker.stdout.on('data', (data) => {
+        workerOutput += data;
+        const lines = workerOutput.split('\n');
+        workerOutput = lines.pop();
+        for (const line of lines) {
+            if (!line.trim()) continue;
+            let output;
+            try {
+                output = JSON.parse(line);
+            } catch (err) {
+                console.error(`Invalid Python worker output: ${line}`);
+                continue;
+            }
+            const callback = pendingRequests.get(output.id);
+            pendingRequests.delete(output.id);
+            if (callback) callback(output);
+            else console.log(`Python worker output:`, output);
+        }
+    });
+
+    worker.stderr.on('data', (data) => {
+        console.error(`stderr: ${data}`);
+    });
+
+    // 'error' and 'exit' can both be emitted for the same worker, it is only restarted once
+    const restart = (reason) => {
+        if (pythonWorker !== worker) return;
+        console.error(`Python worker ${reason}, restarting it`);
+        pythonWorker = null;
+        failPendingRequests(`Python worker ${reason}`);
+        setTimeout(startWorker, WORKER_RESTART_DELAY);
+    };
+    worker.on('exit', (code) => restart(`exited with code ${code}`));
+    worker.on('error', (err) => restart(`failed: ${err.message}`));
+    // e.g. EPIPE when writing to a worker that just died, its 'exit' fails the pending requests
+    worker.stdin.on('error', (err) => console.error(`Python worker stdin error: ${err.message}`));
+
+    pythonWorker = worker;
+}
+
+startWorker();
+
+function sendToWorker(request, callback) {
+    if (!pythonWorker) {
+        callback({success: false, status: 503, message: 'Python worker is restarting, try again later'});
+        return;
+    }
+    request.id = nextRequestId++;
+    pendingRequests.set(request.id, callback);
+    pythonWorker.stdin.write(JSON.stringify(request) + '\n');
+}
+
 function timeoutDestroy(req,res){
     console.log('Session destroyed')
     req.session.destroy((err)=>{
@@ -124,28 +194,9 @@ app.post('/uploadText', (req, res) => {
         const arg2 = "text" ;
         req.session.timestamp = null ;
 
-        // Run the Python script
-        const pythonProcess = spawn('python', ['script.py', arg1, arg2]);
-
-        // Listen for data events on the stdout stream
-        pythonProcess.stdout.on('data', (data) => {
-        const output = JSON.parse(data);
-        console.log(`Python script output:`, output);
-        });
-
-        // Listen for data events on the stderr stream
-        pythonProcess.stderr.on('data', (data) => {
-        console.error(`stderr: ${data}`);
-        });
-
-        // Listen for the 'close' event, which will be emitted when the Python script exits
-        pythonProcess.on('close', (code) => {
-        console.log(`Python script exited with code ${code}`);
-        });
-
-        // Listen for the 'exit' event, which will be emitted when the Python script has finished executing
-        pythonProcess.on('exit', (code) => {
-        console.log(`Python script finished executing with code ${code}`);
+        // Send the request to the resident Python worker
+        sendToWorker({action: 'encrypt', data_value: arg1, data_type: arg2}, (output) => {
+        console.log(`Python worker output:`, output);
         });
 
         res.render('success') ;
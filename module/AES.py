@@ -1,9 +1,23 @@
 """
 AES master key generation along with encryption and decryption
 """
-from Crypto.Cipher import AES
-from PIL import Image, UnidentifiedImageError
-from math import sqrt, floor
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from itertools import chain
+from math import isqrt
+from typing import TYPE_CHECKING, BinaryIO, Iterable, Iterator
+
+try:
+    from . import Support, Timing
+except ImportError:  # run directly as a script instead of as part of the package
+    import Support
+    import Timing
+
+# numpy, pycryptodome and pillow are imported where they are used so that importing this module stays cheap
+if TYPE_CHECKING:
+    import numpy as np
+    from PIL import Image
 
 class InsufficientSamplesException(Exception):
     """Custom Exception that can be called when the samples of provided variable are not enough to perform the required task
@@ -16,12 +30,46 @@ class InsufficientSamplesException(Exception):
         super().__init__(*args)
 
 
-def __addPadding(data: bytes, block_size: int) -> bytes:
-    return data + b"\x00" * (block_size - len(data) % block_size)
+def paddedLastBlock(data: bytes, block_size: int = 16) -> bytes:
+    """returns the PKCS#7 padded last block of the data, only the bytes after its last complete block are copied"""
+    remainder = len(data) % block_size
+    padLength = block_size - remainder
+    return bytes(data[len(data) - remainder:]) + bytes([padLength]) * padLength
 
 
-def __removePadding(data: bytes) -> bytes:
-    return data.rstrip(b"\x00")
+def removePadding(data: bytes|bytearray) -> bytes|bytearray:
+    """removes the PKCS#7 padding, only the last block is inspected. A bytearray is shrunk in place and returned
+    itself, so the message is never copied. Messages encrypted before PKCS#7 padding was used are padded with
+    1 to 16 \x00 bytes instead and always end with a \x00 byte, which a PKCS#7 padded message never does,
+    so their trailing \x00 bytes are removed as before.
+
+    Raises:
+        ValueError: if the padding is invalid, e.g. because of a wrong key
+    """
+    if not data or data[-1] == 0:
+        end = __strippedLength(data)
+    else:
+        padLength = data[-1]
+        if padLength > 16 or data[-padLength:] != bytes([padLength]) * padLength:
+            raise ValueError("invalid padding")
+        end = len(data) - padLength
+
+    if isinstance(data, bytearray):
+        del data[end:]  # shrinks in place
+        return data
+    return data[:end]
+
+
+def __strippedLength(data: bytes|bytearray) -> int:
+    """length of the data without its trailing \x00 bytes, searched 4 KiB at a time instead of copying all of it"""
+    end = len(data)
+    while end:
+        start = max(end - 4096, 0)
+        stripped = len(data[start:end].rstrip(b"\x00"))
+        if stripped:
+            return start + stripped
+        end = start
+    return 0
 
 
 def __toBinary(val: float) -> bytes:
@@ -50,8 +98,27 @@ def __toBinary(val: float) -> bytes:
     return bytes([byte1, byte2])
 
 
+def keySampleIndices(sampleSize: int) -> range:
+    """Returns the indices of the samples `masterKey` uses out of `sampleSize` samples per co-ordinate
+
+    Args:
+        sampleSize (int): number of samples generated per co-ordinate
+
+    Raises:
+        InsufficientSamplesException: occurs if sample size is less than 4
+
+    Returns:
+        range: indices of the samples used for the key
+    """
+    if sampleSize <= 3:
+        raise InsufficientSamplesException("Minimum 4 Samples required!")
+
+    samplingLen = sampleSize // 4
+    return range(samplingLen - 1, sampleSize, samplingLen)
+
+
 def masterKey(
-    x1: list[float], x2: list[float], y1: list[float], y2: list[float]
+    x1: list[float], x2: list[float], y1: list[float], y2: list[float], sampleSize: int|None = None
 ) -> bytes:
     """Generate the AES master key using the four co-ordinate samples generated using a chaotic function
 
@@ -60,6 +127,8 @@ def masterKey(
         x2 (list[float]): One of the co-ordinates generated via chaotic function map
         y1 (list[float]): One of the co-ordinates generated via chaotic function map
         y2 (list[float]): One of the co-ordinates generated via chaotic function map
+        sampleSize (int, optional): if given, the co-ordinates are taken to hold only the samples at
+            `keySampleIndices(sampleSize)` out of `sampleSize` generated ones. Defaults to None.
 
     Raises:
         InsufficientSamplesException: occurs if sample size is less than 4
@@ -67,87 +136,523 @@ def masterKey(
     Returns:
         bytes: the key generated through the sample values. 256 bits = 32 Bytes => size of the bytes = 32
     """
-    sampleSize = len(x1)
-    if sampleSize <= 3:
-        raise InsufficientSamplesException("Minimum 4 Samples required!")
+    if sampleSize is None:
+        # sampling 4 samples from from all the samples
+        indices = keySampleIndices(len(x1))
+        x1_new = [x1[i] for i in indices]
+        x2_new = [x2[i] for i in indices]
+        y1_new = [y1[i] for i in indices]
+        y2_new = [y2[i] for i in indices]
+    else:
+        if len(x1) != len(keySampleIndices(sampleSize)):
+            raise ValueError(f"{len(keySampleIndices(sampleSize))} samples expected for sample size {sampleSize}")
+        x1_new, x2_new, y1_new, y2_new = x1, x2, y1, y2
 
-    samplingLen = sampleSize // 4
+    with Timing.stage("keySampling"):
+        # converting the samples to binary sequence
+        x1_new = [__toBinary(i) for i in x1_new]
+        y1_new = [__toBinary(i) for i in y1_new]
+        x2_new = [__toBinary(i) for i in x2_new]
+        y2_new = [__toBinary(i) for i in y2_new]
 
-    # sampling 4 samples from from all the samples
-    x1_new = x1[samplingLen - 1 : sampleSize : samplingLen]
-    x2_new = x2[samplingLen - 1 : sampleSize : samplingLen]
-    y1_new = y1[samplingLen - 1 : sampleSize : samplingLen]
-    y2_new = y2[samplingLen - 1 : sampleSize : samplingLen]
+        # concatenating all the bytes into a 256-bit long key
+        key = bytes()
+        key += b''.join(x1_new) + b''.join(y1_new) + b''.join(x2_new) + b''.join(y2_new)
 
-    # converting the samples to binary sequence
-    x1_new = [__toBinary(i) for i in x1_new]
-    y1_new = [__toBinary(i) for i in y1_new]
-    x2_new = [__toBinary(i) for i in x2_new]
-    y2_new = [__toBinary(i) for i in y2_new]
+    return key
 
-    # concatenating all the bytes into a 256-bit long key
-    key = bytes()
-    key += b''.join(x1_new) + b''.join(y1_new) + b''.join(x2_new) + b''.join(y2_new)
 
-    return key
+def __toBinaryBatch(vals: "np.ndarray") -> "np.ndarray":
+    # same conversion as __toBinary applied elementwise, returns an extra trailing axis of the 2 bytes
+    import numpy as np
+
+    if not np.all((vals > -8) & (vals < 8)):
+        raise ValueError("floating value must be  in range (-8, 8)")
+
+    vals = vals + 8
+    integer = vals.astype(np.int64)
+    scaled_fraction = ((2**12) * (vals - integer)).astype(np.int64)
+
+    byte1 = (integer << 4) | (scaled_fraction >> 8)
+    byte2 = scaled_fraction & 0xFF
+    return np.stack([byte1, byte2], axis=-1).astype(np.uint8)
+
+
+def masterKeyBatch(
+    x1: "np.ndarray", x2: "np.ndarray", y1: "np.ndarray", y2: "np.ndarray", total_samples: "np.ndarray"
+) -> list[bytes]:
+    """Generates the master keys of many pendulums at once, row i of the co-ordinates gives the same key as
+    `masterKey(x1[i][:total_samples[i]], x2[i][:total_samples[i]], y1[i][:total_samples[i]], y2[i][:total_samples[i]])`
+
+    Args:
+        x1 (np.ndarray): co-ordinates of shape (n, samples) as returned by `DoublePendulum.getCoordinatesBatch`
+        x2 (np.ndarray): co-ordinates of shape (n, samples) as returned by `DoublePendulum.getCoordinatesBatch`
+        y1 (np.ndarray): co-ordinates of shape (n, samples) as returned by `DoublePendulum.getCoordinatesBatch`
+        y2 (np.ndarray): co-ordinates of shape (n, samples) as returned by `DoublePendulum.getCoordinatesBatch`
+        total_samples (np.ndarray): number of valid samples in each row
+
+    Raises:
+        InsufficientSamplesException: occurs if sample size of any row is less than 4
+
+    Returns:
+        list[bytes]: the key of every row
+    """
+    import numpy as np
 
+    total_samples = np.asarray(total_samples).astype(int)
+    coordinates = np.stack([x1, y1, x2, y2], axis=1)  # (n, 4, samples) in the order the key is concatenated
+    keys = [b""] * len(total_samples)
 
-def encrypt(msg: bytes, masterKey: bytes) -> tuple[bytes, bytes]:
+    # rows with the same sample size share the sampled indices, so each group is converted in one go
+    for sampleSize in np.unique(total_samples):
+        rows = np.flatnonzero(total_samples == sampleSize)
+        sampled = coordinates[rows][:, :, keySampleIndices(int(sampleSize))]
+        keyBytes = __toBinaryBatch(sampled).reshape(len(rows), -1)
+        for row, key in zip(rows, keyBytes):
+            keys[row] = key.tobytes()
+
+    return keys
+
+
+def encryptedSize(msgLength: int) -> int:
+    """returns the length of the cipher text of a `msgLength` bytes long message, without the initial vector"""
+    return msgLength - msgLength % 16 + 16
+
+
+def encryptInto(msg: bytes, masterKey: bytes, output: bytearray|memoryview) -> bytes:
+    """encrypts the message 'msg' using the AES key 'masterKey' straight into the writable buffer 'output'.
+    The complete blocks are encrypted from the message without copying it, only the padded last block is built separately.
+
+    Args:
+        msg (bytes): message to be encrypted. can be any data in a byte like sequence
+        masterKey (bytes): 128/192/256 bit long key used for AES encryption
+        output (bytearray | memoryview): buffer of exactly `encryptedSize(len(msg))` bytes to write the cipher text to
+
+    Returns:
+        bytes: the initial vector
+    """
+    from Crypto.Cipher import AES
+
+    if len(output) != encryptedSize(len(msg)):
+        raise ValueError(f"output must be {encryptedSize(len(msg))} bytes long")
+
+    with Timing.stage("padding"):
+        complete = len(msg) - len(msg) % AES.block_size
+        lastBlock = paddedLastBlock(msg, AES.block_size)
+
+    with Timing.stage("aes"):
+        cipher = AES.new(key=masterKey, mode=AES.MODE_CBC)
+        output = memoryview(output)
+        if complete:
+            cipher.encrypt(memoryview(msg)[:complete], output=output[:complete])
+        cipher.encrypt(lastBlock, output=output[complete:])
+    return cipher.iv
+
+
+def encrypt(msg: bytes, masterKey: bytes) -> tuple[bytes, bytes|bytearray]:
     """encrypts the message 'msg' using the AES key 'masterKey'.
-    The message may be padded in case the message is not a multiple of the block size.
+    The message is PKCS#7 padded to a multiple of the block size.
 
     Args:
         msg (bytes): message to be encrypted. can be any data in a byte like sequence
         masterKey (bytes): 128/192/256 bit long key used for AES encryption
 
     Returns:
-        tuple[bytes, bytes]: initial vector and cipher text are returned as a tuple
+        tuple[bytes, bytes|bytearray]: initial vector and cipher text are returned as a tuple
     """
-    cipher = AES.new(key=masterKey, mode=AES.MODE_CBC)
-    cipherMsg = cipher.encrypt(__addPadding(msg, AES.block_size))
+    if len(msg) > 2**16:
+        cipherMsg = bytearray(encryptedSize(len(msg)))
+        initial_vector = encryptInto(msg, masterKey, cipherMsg)
+        return initial_vector, cipherMsg
+
+    # copying a short message costs less than the extra calls of encrypting it in place
+    from Crypto.Cipher import AES
+
+    with Timing.stage("padding"):
+        msg = msg[:len(msg) - len(msg) % AES.block_size] + paddedLastBlock(msg, AES.block_size)
+    with Timing.stage("aes"):
+        cipher = AES.new(key=masterKey, mode=AES.MODE_CBC)
+        cipherMsg = cipher.encrypt(msg)
     return cipher.iv, cipherMsg
 
 
-def decrypt(cipherMsg: bytes, masterKey: bytes, initial_vector: bytes) -> bytes:
+def decrypt(cipherMsg: bytes, masterKey: bytes, initial_vector: bytes, workers: int|None = 1, chunkSize: int = 2**20) -> bytearray:
     """decrypts the message 'cipherMsg' using AES key 'masterKey' and the given initial vector.
+    Every CBC plaintext block only depends on two adjacent cipher text blocks, so the cipher text is split into
+    chunks that are decrypted on a thread pool, each chunk using the last cipher text block before it as its
+    initial vector (pycryptodome releases the GIL while decrypting).
 
     Args:
         cipherMsg (bytes): the byte sequence to be decrypted
         masterKey (bytes): 128/192/256 bit long sequence used to encrypt the message
         initial_vector (bytes): initial vector returned during encryption
+        workers (int | None, optional): number of threads, os.cpu_count() if None and 1 to decrypt in this thread. Processes of
+            a pool (workerScript.py, batchEncryptionScript.py, serviceScript.py) keep 1, as they already use every CPU. Defaults to 1.
+        chunkSize (int, optional): cipher text bytes per chunk, rounded down to a multiple of the block size. Defaults to 1 MiB.
 
     Returns:
-        bytes: decrypted message
+        bytearray: decrypted message, decrypted into a single buffer that the padding is removed from in place
     """
-    cipher = AES.new(key=masterKey, mode=AES.MODE_CBC, iv=initial_vector)
-    msg = __removePadding(cipher.decrypt(cipherMsg))
-    return msg
+    from Crypto.Cipher import AES
 
+    workers = workers or os.cpu_count() or 1
+    chunkSize = max(chunkSize - chunkSize % AES.block_size, AES.block_size)
+    if workers <= 1 or len(cipherMsg) <= chunkSize:
+        msg = bytearray(len(cipherMsg))
+        with Timing.stage("aes"):
+            AES.new(key=masterKey, mode=AES.MODE_CBC, iv=initial_vector).decrypt(cipherMsg, output=msg)
+        with Timing.stage("padding"):
+            return removePadding(msg)
 
-def encryptToImage(msg: bytes, masterKey: bytes, filename: str) -> None:
-    initial_vector, cipherMsg = encrypt(msg, masterKey)
-    cipherMsg = initial_vector + cipherMsg
-    totPixels = len(cipherMsg)
-    height = floor(sqrt(totPixels))
-    
-     # finding image dimensions such that height * width = totPixels 
-    while totPixels % height != 0:
-        height -= 1
-    
-    img = Image.frombytes(mode="L", size=(totPixels//height, height), data=cipherMsg)
-    img.save(filename)
+    if len(cipherMsg) % AES.block_size:
+        raise ValueError("cipher text length must be a multiple of the block size")
 
+    cipherView = memoryview(cipherMsg)
+    msg = bytearray(len(cipherMsg))
+    msgView = memoryview(msg)
 
-def decryptFromImage(filename: str, masterKey: bytes) -> bytes:
-    img = Image.open(filename)
-    cipherMsg = bytes(img.getdata())
-        
-    initial_vector, cipherMsg = cipherMsg[0:16], cipherMsg[16:]
-        
-    return decrypt(cipherMsg, masterKey, initial_vector)
+    def decryptChunk(start: int) -> None:
+        iv = cipherView[start - AES.block_size : start] if start else initial_vector
+        end = start + chunkSize
+        AES.new(key=masterKey, mode=AES.MODE_CBC, iv=iv).decrypt(cipherView[start:end], output=msgView[start:end])
+
+    with Timing.stage("aes"), ThreadPoolExecutor(max_workers=workers) as executor:
+        # list() re-raises any exception of the threads
+        list(executor.map(decryptChunk, range(0, len(cipherMsg), chunkSize)))
+
+    msgView.release()  # so the padding can be removed in place
+    with Timing.stage("padding"):
+        return removePadding(msg)
+
+
+class Encryptor:
+    """Incremental version of `encrypt` for messages that do not fit in memory.
+    `update` can be called with chunks of any size, the concatenated output of every `update` and `finalize`
+    is the same cipher text `encrypt` returns for the whole message under the same initial vector.
+
+    Args:
+        masterKey (bytes): 128/192/256 bit long key used for AES encryption
+        initial_vector (bytes | None, optional): a random one is generated if None. Defaults to None.
+    """
+
+    def __init__(self, masterKey: bytes, initial_vector: bytes|None = None) -> None:
+        from Crypto.Cipher import AES
+
+        self._cipher = AES.new(key=masterKey, mode=AES.MODE_CBC, iv=initial_vector)
+        self.iv: bytes = self._cipher.iv
+        self._buffer = b""
+
+    def update(self, data: bytes) -> bytes:
+        """encrypts all complete blocks of the buffered and given data, the rest is kept for the next call"""
+        data = self._buffer + data
+        complete = len(data) - len(data) % 16
+        self._buffer = data[complete:]
+        return self._cipher.encrypt(data[:complete]) if complete else b""
+
+    def finalize(self) -> bytes:
+        """pads and encrypts the remaining data, the encryptor can not be used after this"""
+        data = paddedLastBlock(self._buffer)
+        self._buffer = b""
+        return self._cipher.encrypt(data)
+
+
+class Decryptor:
+    """Incremental version of `decrypt`, the concatenated output of every `update` and `finalize` is the same
+    message `decrypt` returns for the whole cipher text. Only the last decrypted block is held back until `finalize`
+    as it holds the padding. Messages zero padded before PKCS#7 padding was used only get the trailing \x00 bytes of
+    that block removed, which is all of their padding, while `decrypt` also removes the ones of the message before it.
+
+    Args:
+        masterKey (bytes): 128/192/256 bit long sequence used to encrypt the message
+        initial_vector (bytes): initial vector returned during encryption
+    """
+
+    def __init__(self, masterKey: bytes, initial_vector: bytes) -> None:
+        from Crypto.Cipher import AES
+
+        self._cipher = AES.new(key=masterKey, mode=AES.MODE_CBC, iv=initial_vector)
+        self._buffer = b""
+        self._lastBlock = b""
+
+    def update(self, cipherMsg: bytes) -> bytes:
+        """decrypts all complete blocks of the buffered and given cipher text, the rest is kept for the next call"""
+        cipherMsg = self._buffer + cipherMsg
+        complete = len(cipherMsg) - len(cipherMsg) % 16
+        self._buffer = cipherMsg[complete:]
+        if not complete:
+            return b""
+
+        msg = self._lastBlock + self._cipher.decrypt(cipherMsg[:complete])
+        msg, self._lastBlock = msg[:-16], msg[-16:]
+        return msg
+
+    def finalize(self) -> bytes:
+        """checks that the cipher text ended on a block boundary and returns the held back block without the padding
+
+        Raises:
+            ValueError: if the cipher text is not a multiple of the block size or its padding is invalid
+        """
+        if self._buffer or not self._lastBlock:
+            raise ValueError("cipher text length must be a non zero multiple of the block size")
+
+        msg = removePadding(self._lastBlock)
+        self._lastBlock = b""
+        return msg
+
+
+def __chunks(source: BinaryIO|Iterable[bytes], chunkSize: int) -> Iterator[bytes]:
+    if hasattr(source, "read"):
+        while chunk := source.read(chunkSize):
+            yield chunk
+    else:
+        yield from source
+
+
+def encryptStream(source: BinaryIO|Iterable[bytes], masterKey: bytes, chunkSize: int = 2**16) -> Iterator[bytes]:
+    """encrypts a file-like object or an iterable of byte chunks while holding only about one chunk in memory.
+
+    Args:
+        source (BinaryIO | Iterable[bytes]): message to encrypt, file-like objects are read `chunkSize` bytes at a time
+        masterKey (bytes): 128/192/256 bit long key used for AES encryption
+        chunkSize (int, optional): bytes read from file-like objects at a time. Defaults to 64 KiB.
+
+    Yields:
+        Iterator[bytes]: the initial vector followed by the cipher text, the same layout `encryptToImage` stores
+    """
+    encryptor = Encryptor(masterKey)
+    yield encryptor.iv
+    for chunk in __chunks(source, chunkSize):
+        if cipherChunk := encryptor.update(chunk):
+            yield cipherChunk
+    yield encryptor.finalize()
+
+
+def decryptStream(source: BinaryIO|Iterable[bytes], masterKey: bytes, chunkSize: int = 2**16) -> Iterator[bytes]:
+    """decrypts the output of `encryptStream` (initial vector followed by the cipher text) chunk by chunk.
+
+    Args:
+        source (BinaryIO | Iterable[bytes]): initial vector and cipher text, file-like objects are read `chunkSize` bytes at a time
+        masterKey (bytes): 128/192/256 bit long sequence used to encrypt the message
+        chunkSize (int, optional): bytes read from file-like objects at a time. Defaults to 64 KiB.
+
+    Yields:
+        Iterator[bytes]: the decrypted message
+    """
+    header = b""
+    decryptor = None
+    for chunk in __chunks(source, chunkSize):
+        if decryptor is None:
+            header += chunk
+            if len(header) < 16:
+                continue
+            decryptor = Decryptor(masterKey, header[:16])
+            chunk = header[16:]
+
+        if msgChunk := decryptor.update(chunk):
+            yield msgChunk
+
+    if decryptor is None:
+        raise ValueError("cipher text must start with the 16 byte initial vector")
+    if msgChunk := decryptor.finalize():
+        yield msgChunk
+
+
+# cipher text images start with this magic and the length of the stored data (initial vector + cipher text),
+# the pixels after the data only pad the image to a near square rectangle
+IMAGE_MAGIC = b"DPAE"
+IMAGE_HEADER_SIZE = len(IMAGE_MAGIC) + 8
+
+# formats that store the pixels of an "L" image uncompressed, the format is chosen by the extension of the filename
+UNCOMPRESSED_IMAGE_EXTENSIONS = (".pgm", ".tif", ".tiff")
+
+
+def imageLayout(totPixels: int) -> tuple[int, int]:
+    """returns the (width, height) of the smallest near square image holding `totPixels` pixels,
+    the image has less than `width` pixels more than needed and its sides differ by at most one pixel"""
+    width = isqrt(totPixels - 1) + 1 if totPixels > 1 else 1
+    return width, max(-(-totPixels // width), 1)
+
+
+def __cipherPixels(msg: bytes, masterKey: bytes) -> tuple[tuple[int, int], bytearray]:
+    # header, initial vector and cipher text are written straight into the zero padded pixel buffer
+    length = 16 + encryptedSize(len(msg))
+    width, height = imageLayout(IMAGE_HEADER_SIZE + length)
+    data = bytearray(width * height)
+    data[:IMAGE_HEADER_SIZE] = IMAGE_MAGIC + length.to_bytes(8, "big")
+    data[IMAGE_HEADER_SIZE:IMAGE_HEADER_SIZE + 16] = encryptInto(msg, masterKey, memoryview(data)[IMAGE_HEADER_SIZE + 16:IMAGE_HEADER_SIZE + length])
+    return (width, height), data
+
+
+def cipherImage(msg: bytes, masterKey: bytes) -> "Image.Image":
+    """encrypts the message and returns the initial vector followed by the cipher text as the pixels of a grayscale image.
+    The image is laid out as a near square (see `imageLayout`) and starts with a header recording the length of the data.
+
+    Args:
+        msg (bytes): the message to be encrypted
+        masterKey (bytes): 128/192/256 bit long sequence used to encrypt the message
+
+    Returns:
+        Image.Image: the "L" image holding the cipher text
+    """
+    from PIL import Image
+
+    size, data = __cipherPixels(msg, masterKey)
+    return Image.frombuffer("L", size, data, "raw", "L", 0, 1)
+
+
+def encryptToImage(msg: bytes, masterKey: bytes, filename: str|BinaryIO, compressLevel: int = 0, format: str|None = None) -> None:
+    """encrypts the message and stores the image of `cipherImage`.
+    The cipher text is indistinguishable from random bytes, so PNGs are stored without compression by default and
+    written by `Support.PngStripWriter` without the row filters pillow spends most of its time choosing.
+    PGM and TIFF files (see UNCOMPRESSED_IMAGE_EXTENSIONS) are always written uncompressed.
+
+    Args:
+        msg (bytes): the message to be encrypted
+        masterKey (bytes): 128/192/256 bit long sequence used to encrypt the message
+        filename (str | BinaryIO): path of the image, its extension decides the image format, or a file-like object to write it to
+        compressLevel (int, optional): zlib level 0-9 of PNG images. Defaults to 0 (stored only).
+        format (str | None, optional): pillow format to write instead of the one of the extension, e.g. "PNG" or "PPM" (PGM).
+            Defaults to None, which is PNG for file-like objects.
+    """
+    from PIL import Image
+
+    size, data = __cipherPixels(msg, masterKey)
+
+    if format is None and not isinstance(filename, str):
+        format = "PNG"
+    png = format.upper() == "PNG" if format else not filename.lower().endswith(UNCOMPRESSED_IMAGE_EXTENSIONS)
+
+    with Timing.stage("imageEncode"):
+        if not png:
+            Image.frombuffer("L", size, data, "raw", "L", 0, 1).save(filename, format=format)
+        else:
+            with open(filename, "wb") if isinstance(filename, str) else nullcontext(filename) as file:
+                writer = Support.PngStripWriter(file, size, "L", compressLevel)
+                writer.write(data)
+                writer.close()
+
+
+def decryptFromImage(filename: "str|BinaryIO|Image.Image", masterKey: bytes, workers: int|None = 1) -> bytearray:
+    """decrypts the image written by `encryptToImage`
+
+    Args:
+        filename (str | BinaryIO | Image.Image): path of the image, a file-like object to read it from or the image itself
+        masterKey (bytes): 128/192/256 bit long sequence used to encrypt the message
+        workers (int | None, optional): number of threads to decrypt with, see `decrypt`. Defaults to 1.
+
+    Returns:
+        bytearray: decrypted message
+    """
+    from PIL import Image
+
+    with Timing.stage("imageDecode"):
+        if isinstance(filename, Image.Image):
+            cipherMsg = memoryview(filename.tobytes())
+        else:
+            with Image.open(filename) as img:
+                # a single copy of the decoded pixels, sliced without copying again
+                cipherMsg = memoryview(img.tobytes())
+
+    if cipherMsg[:len(IMAGE_MAGIC)] == IMAGE_MAGIC:
+        length = int.from_bytes(cipherMsg[len(IMAGE_MAGIC):IMAGE_HEADER_SIZE], "big")
+        cipherMsg = cipherMsg[IMAGE_HEADER_SIZE:IMAGE_HEADER_SIZE + length]
+    # else: image written before the header was added, every pixel is part of the data
+
+    initial_vector, cipherMsg = bytes(cipherMsg[0:16]), cipherMsg[16:]
+
+    return decrypt(cipherMsg, masterKey, initial_vector, workers)
+
+
+def encryptStreamToImage(chunks: Iterable[bytes], length: int, masterKey: bytes, filename: str, compressLevel: int = 0) -> None:
+    """strip-wise version of `encryptToImage` for a message of `length` bytes given in chunks, e.g. by `Support.imageStrips`.
+    The layout of the image follows from the length up front, so every chunk is encrypted and written to the image before
+    the next one is read and only about one chunk is held in memory. The image is written by `Support.PngStripWriter`,
+    or as PGM for .pgm filenames, so `decryptStreamFromImage` can read it back strip-wise as well.
+
+    Args:
+        chunks (Iterable[bytes]): the message to be encrypted, split anywhere
+        length (int): total length of the chunks
+        masterKey (bytes): 128/192/256 bit long sequence used to encrypt the message
+        filename (str): path of the PNG or PGM image
+        compressLevel (int, optional): zlib level 0-9 of PNG images. Defaults to 0 (stored only).
+
+    Raises:
+        ValueError: if the chunks do not add up to `length` bytes, the image is removed again
+    """
+    dataLength = 16 + encryptedSize(length)
+    width, height = imageLayout(IMAGE_HEADER_SIZE + dataLength)
+    encryptor = Encryptor(masterKey)
+
+    try:
+        with open(filename, "wb") as file:
+            if filename.lower().endswith(".pgm"):
+                writer = Support.NetpbmStripWriter(file, (width, height), "L")
+            else:
+                writer = Support.PngStripWriter(file, (width, height), "L", compressLevel)
+            writer.write(IMAGE_MAGIC + dataLength.to_bytes(8, "big") + encryptor.iv)
+
+            received = 0
+            for chunk in chunks:
+                received += len(chunk)
+                with Timing.stage("aes"):
+                    cipherChunk = encryptor.update(chunk)
+                with Timing.stage("imageEncode"):
+                    writer.write(cipherChunk)
+            if received != length:
+                raise ValueError(f"{length} bytes of message expected, {received} given")
+
+            with Timing.stage("aes"):
+                cipherChunk = encryptor.finalize()
+            with Timing.stage("imageEncode"):
+                writer.write(cipherChunk + bytes(width * height - IMAGE_HEADER_SIZE - dataLength))
+                writer.close()
+    except BaseException:
+        os.remove(filename)
+        raise
+
+
+def __take(chunks: Iterator[bytes], length: int) -> Iterator[bytes]:
+    for chunk in chunks:
+        if length <= 0:
+            return
+        yield chunk[:length]
+        length -= len(chunk)
+    if length > 0:
+        raise ValueError("image ends before the data stored in it")
+
+
+def decryptStreamFromImage(filename: str, masterKey: bytes, chunkSize: int = 2**20) -> Iterator[bytes]:
+    """strip-wise version of `decryptFromImage` for images with the length header, the pixels are read by
+    `Support.readStrips` instead of pillow, so images of any size are decrypted while holding about one chunk in memory.
+
+    Args:
+        filename (str): path of the PNG or PGM image
+        masterKey (bytes): 128/192/256 bit long sequence used to encrypt the message
+        chunkSize (int, optional): approximate bytes of pixels read at a time. Defaults to 1 MiB.
+
+    Raises:
+        ValueError: if the image has no length header or can not be read strip-wise
+
+    Yields:
+        Iterator[bytes]: the decrypted message
+    """
+    pixels = Support.readStrips(filename, chunkSize)
+    header = b""
+    for strip in pixels:
+        header += strip
+        if len(header) >= IMAGE_HEADER_SIZE:
+            break
+
+    if header[:len(IMAGE_MAGIC)] != IMAGE_MAGIC:
+        raise ValueError("only images with a length header can be decrypted strip-wise")
+    length = int.from_bytes(header[len(IMAGE_MAGIC):IMAGE_HEADER_SIZE], "big")
+
+    yield from decryptStream(__take(chain([header[IMAGE_HEADER_SIZE:]], pixels), length), masterKey)
 
 
 def imageToBytes(filepath):
+    from PIL import Image, UnidentifiedImageError
+
     try:
         img = Image.open(filepath)
     except UnidentifiedImageError:
@@ -155,6 +660,8 @@ def imageToBytes(filepath):
 
 
 def __main():
+    from PIL import Image
+
     # x1, x2, y1, y2 = getCoordinates(total_samples=4)
     # key = masterKey(x1,x2,y1,y2, )
     # x1, x2, y1, y2 = getCoordinates(total_samples=4, length_1=2.0000000000000001)
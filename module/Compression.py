@@ -0,0 +1,90 @@
+"""
+Optional compression of the payloads before they are encrypted.
+
+The codec is recorded in the upper 4 bits of the payload type byte (see `Handlers`), the lower 4 bits keep the data type,
+so payloads encrypted without compression are read the same as before.
+"""
+
+# codec ids stored in the payload type byte, 0 means not compressed
+CODECS = {"zlib": 1, "lzma": 2, "bz2": 3, "lz4": 4}
+
+# the compressed payload has to save at least this fraction of the size to be used
+MIN_SAVING = 0.05
+# payloads larger than twice this size are only compressed completely if a sample of this size compresses well enough
+SAMPLE_SIZE = 2**16
+
+
+def __compressor(codec: str, level: int|None):
+    if codec == "zlib":
+        import zlib
+        return lambda data: zlib.compress(data, 6 if level is None else level)
+    if codec == "lzma":
+        import lzma
+        return lambda data: lzma.compress(data, preset=6 if level is None else level)
+    if codec == "bz2":
+        import bz2
+        return lambda data: bz2.compress(data, 9 if level is None else level)
+    if codec == "lz4":
+        try:
+            import lz4.frame
+        except ImportError:
+            raise ValueError("the lz4 codec needs the lz4 package (pip install lz4)") from None
+        return lambda data: lz4.frame.compress(data, compression_level=0 if level is None else level)
+    raise ValueError(f"unknown codec {codec}, must be one of {', '.join(CODECS)}")
+
+
+def checkCodec(codec: str) -> None:
+    """checks the codec before anything is done with it, e.g. before a key is generated for the payload
+
+    Raises:
+        ValueError: if the codec is unknown or its package is not installed
+    """
+    __compressor(codec, None)
+
+
+def compress(data: bytes|memoryview, codec: str, level: int|None = None) -> tuple[int, bytes|memoryview]:
+    """compresses the data unless that does not save at least MIN_SAVING of its size.
+    Large payloads are checked on a sample of SAMPLE_SIZE bytes first, so incompressible data such as the pixels of
+    noisy photos costs only the sample.
+
+    Args:
+        data (bytes | memoryview): payload to compress
+        codec (str): one of CODECS, "zlib" at level 1 or "lz4" are the fast choices
+        level (int | None, optional): compression level of the codec, its default if None. Defaults to None.
+
+    Raises:
+        ValueError: if the codec is unknown or its package is not installed
+
+    Returns:
+        tuple[int, bytes | memoryview]: the codec id and the compressed data, or 0 and the data itself if it was not compressed
+    """
+    compressor = __compressor(codec, level)
+
+    if len(data) > 2 * SAMPLE_SIZE:
+        middle = len(data) // 2
+        if len(compressor(data[middle:middle + SAMPLE_SIZE])) > SAMPLE_SIZE * (1 - MIN_SAVING):
+            return 0, data
+
+    compressed = compressor(data)
+    if len(compressed) > len(data) * (1 - MIN_SAVING):
+        return 0, data
+    return CODECS[codec], compressed
+
+
+def decompress(data: bytes|memoryview, codecId: int) -> bytes|memoryview:
+    """decompresses data compressed by `compress` with the codec `codecId`, data of codec 0 is returned as it is"""
+    if codecId == 0:
+        return data
+    if codecId == CODECS["zlib"]:
+        import zlib
+        return zlib.decompress(data)
+    if codecId == CODECS["lzma"]:
+        import lzma
+        return lzma.decompress(data)
+    if codecId == CODECS["bz2"]:
+        import bz2
+        return bz2.decompress(data)
+    if codecId == CODECS["lz4"]:
+        import lz4.frame
+        return lz4.frame.decompress(data)
+    raise ValueError(f"unknown codec id {codecId}")
@@ -1,13 +1,21 @@
-
 import numpy as np
-import sympy as smp
-from scipy.integrate import odeint
 
+try:
+    from . import Timing
+except ImportError:  # run directly as a script instead of as part of the package
+    import Timing
 
 
+def deriveEquations():
+    """Derives the equations of motion of the double pendulum symbolically using sympy.
+    This is only needed to regenerate or verify `__dz1dt` and `__dz2dt` below, key derivation never calls it.
+
+    Returns:
+        tuple[Callable, Callable]: lambdified second derivatives of theta_1 and theta_2
+            with arguments (t, g, m1, m2, L1, L2, theta_1, theta_2, dtheta_1/dt, dtheta_2/dt)
+    """
+    import sympy as smp
 
-# intially passsing both angles theta_1_initial,theta_2_initial and both angular velocities w1 and w2
-def getCoordinates(total_time: float=40, total_samples:int=1001, theta1_initial:float=1, angularVelocity_initial_1:float=-3, theta2_intial:float=-1, angularVelocity_initial_2:float=5, mass1:float=2, mass2:float=1, length_1:float=2, length_2:float=1, gravity:float=9.81):
     t, g = smp.symbols('t g')
     m1, m2 = smp.symbols('m1 m2')
     L1, L2 = smp.symbols('L1, L2')
@@ -62,29 +70,88 @@ def getCoordinates(total_time: float=40, total_samples:int=1001, theta1_initial:
     sols = smp.solve([LE1, LE2], (the1_dd, the2_dd),
                      simplify=False, rational=False)
 
-
     dz1dt_f = smp.lambdify(
         (t, g, m1, m2, L1, L2, the1, the2, the1_d, the2_d), sols[the1_dd])
     dz2dt_f = smp.lambdify(
         (t, g, m1, m2, L1, L2, the1, the2, the1_d, the2_d), sols[the2_dd])
-    dthe1dt_f = smp.lambdify(the1_d, the1_d)
-    dthe2dt_f = smp.lambdify(the2_d, the2_d)
 
-    """Now define $\vec{S} = (\theta_1, z_1, \theta_2, z_2)$. IF we're going to use an ODE solver in python, we need to write a function that takes in $\vec{S}$ and $t$ and returns $d\vec{S}/dt$. In other words, we need to define $d\vec{S}/dt (\vec{S}, t)$
+    return dz1dt_f, dz2dt_f
 
-    * Our system of ODEs can be fully specified using $d\vec{S}/dt$ and depends only on $\vec{S}$ and $t$
-    """
-    
-    def dSdt(S, t, g, m1, m2, L1, L2):
-        the1, z1, the2, z2 = S
-        return [
-            dthe1dt_f(z1),
-            dz1dt_f(t, g, m1, m2, L1, L2, the1, the2, z1, z2),
-            dthe2dt_f(z2),
-            dz2dt_f(t, g, m1, m2, L1, L2, the1, the2, z1, z2),
-        ]
 
-    """Solvint the system of ODEs using scipys `odeint` method"""
+"""The functions below are the source generated by `deriveEquations` (sympy.lambdify), with the repeated
+sub-expressions `the2 - the1` and the common denominator pulled out. The order of every floating point
+operation is kept as generated so the trajectories stay bit-identical to the symbolic derivation."""
+
+def __dz1dt(t, g, m1, m2, L1, L2, the1, the2, z1, z2):
+    delta = the2 - the1
+    sin_delta, cos_delta = np.sin(delta), np.cos(delta)
+    sin1, cos1, sin2, cos2 = np.sin(the1), np.cos(the1), np.sin(the2), np.cos(the2)
+    den = 1.0*L1*m1 - 1.0*L1*m2*cos_delta**2 + 1.0*L1*m2
+    return (
+        1.0*z2**2*L2*m2*sin_delta/den
+        + 1.0*z2*z1*L1*m2*sin2*cos1*cos_delta/den
+        - 1.0*z2*z1*L1*m2*sin1*cos2*cos_delta/den
+        - 1.0*z2*z1*L1*m2*sin_delta*cos_delta/den
+        + 1.0*z2*z1*L2*m2*sin2*cos1/den
+        - 1.0*z2*z1*L2*m2*sin1*cos2/den
+        - 1.0*z2*z1*L2*m2*sin_delta/den
+        + 1.0*z1**2*L1*m2*sin_delta*cos_delta/den
+        - 1.0*g*m1*sin1/den
+        + 1.0*g*m2*sin2*cos_delta/den
+        - 1.0*g*m2*sin1/den
+    )
+
+
+def __dz2dt(t, g, m1, m2, L1, L2, the1, the2, z1, z2):
+    delta = the2 - the1
+    sin_delta, cos_delta = np.sin(delta), np.cos(delta)
+    sin1, cos1, sin2, cos2 = np.sin(the1), np.cos(the1), np.sin(the2), np.cos(the2)
+    den = 1.0*L2*m1 - 1.0*L2*m2*cos_delta**2 + 1.0*L2*m2
+    return (
+        -1.0*z2**2*L2*m2*sin_delta*cos_delta/den
+        - 1.0*z2*z1*L1*m1*sin2*cos1/den
+        + 1.0*z2*z1*L1*m1*sin1*cos2/den
+        + 1.0*z2*z1*L1*m1*sin_delta/den
+        - 1.0*z2*z1*L1*m2*sin2*cos1/den
+        + 1.0*z2*z1*L1*m2*sin1*cos2/den
+        + 1.0*z2*z1*L1*m2*sin_delta/den
+        - 1.0*z2*z1*L2*m2*sin2*cos1*cos_delta/den
+        + 1.0*z2*z1*L2*m2*sin1*cos2*cos_delta/den
+        + 1.0*z2*z1*L2*m2*sin_delta*cos_delta/den
+        - 1.0*z1**2*L1*m1*sin_delta/den
+        - 1.0*z1**2*L1*m2*sin_delta/den
+        - 1.0*g*m1*sin2/den
+        + 1.0*g*m1*sin1*cos_delta/den
+        - 1.0*g*m2*sin2/den
+        + 1.0*g*m2*sin1*cos_delta/den
+    )
+
+
+"""Now define $\vec{S} = (\theta_1, z_1, \theta_2, z_2)$. IF we're going to use an ODE solver in python, we need to write a function that takes in $\vec{S}$ and $t$ and returns $d\vec{S}/dt$. In other words, we need to define $d\vec{S}/dt (\vec{S}, t)$
+
+* Our system of ODEs can be fully specified using $d\vec{S}/dt$ and depends only on $\vec{S}$ and $t$
+"""
+
+def __dSdt(S, t, g, m1, m2, L1, L2):
+    the1, z1, the2, z2 = S
+    return [
+        z1,
+        __dz1dt(t, g, m1, m2, L1, L2, the1, the2, z1, z2),
+        z2,
+        __dz2dt(t, g, m1, m2, L1, L2, the1, the2, z1, z2),
+    ]
+
+
+# intially passsing both angles theta_1_initial,theta_2_initial and both angular velocities w1 and w2
+def getCoordinates(total_time: float=40, total_samples:int=1001, theta1_initial:float=1, angularVelocity_initial_1:float=-3, theta2_intial:float=-1, angularVelocity_initial_2:float=5, mass1:float=2, mass2:float=1, length_1:float=2, length_2:float=1, gravity:float=9.81, sample_indices:range|list[int]|None=None):
+    """Solvint the system of ODEs using scipys `odeint` method
+
+    If `sample_indices` is given, only the samples at those indices of the `total_samples` long time grid are returned
+    (e.g. `AES.keySampleIndices(total_samples)`), so positions are only computed for those. They are bit-identical to the
+    same samples of the full output.
+    """
+    # scipy takes longer to import than the rest of key derivation, so it is only loaded once a pendulum is integrated
+    from scipy.integrate import odeint
 
     t = np.linspace(0, total_time, total_samples)
     g = gravity
@@ -92,16 +159,23 @@ def getCoordinates(total_time: float=40, total_samples:int=1001, theta1_initial:
     m2 = mass2
     L1 = length_1
     L2 = length_2
-    ans = odeint(dSdt, y0=[theta1_initial, angularVelocity_initial_1, theta2_intial, angularVelocity_initial_2],
-                 t=t, args=(g, m1, m2, L1, L2))
+
+    with Timing.stage("odeint"):
+        # the solver is always asked for the whole time grid: its steps are the same for any output times, but its default
+        # limit of 500 steps between two of them is not, so asking for fewer times gives other keys whenever a grid interval
+        # needs more (odeint returns uninitialised memory after "Excess work done"). outputting every time costs next to nothing.
+        ans = odeint(__dSdt, y0=[theta1_initial, angularVelocity_initial_1, theta2_intial, angularVelocity_initial_2],
+                     t=t, args=(g, m1, m2, L1, L2))
+        if sample_indices is not None:
+            ans = ans[np.asarray(sample_indices, dtype=int)]
 
     """Can obtain $\theta_1(t)$ and $\theta_2(t)$ from the answer"""
 
     the1 = ans.T[0]
     the2 = ans.T[2]
-    
+
     """Here's a function that takes in $\theta_1$ and $\theta_2$ and returns the location (x,y) of the two masses."""
-    
+
     x1 = L1 * np.sin(the1)
     y1 = -L1 * np.cos(the1)
     x2 = L1 * np.sin(the1) + L2 * np.sin(the2)
@@ -109,4 +183,102 @@ def getCoordinates(total_time: float=40, total_samples:int=1001, theta1_initial:
 
     """Then we can make an animation"""
 
-    return x1, y1, x2, y2
\ No newline at end of file
+    return x1, y1, x2, y2
+
+def getCoordinatesBatch(params, max_step: float=0.01):
+    """Integrates many double pendulums together as NumPy arrays, one row of `params` per pendulum.
+    A fixed-step RK4 scheme is used instead of `odeint` so that every step is a handful of array operations
+    over the whole batch. The samples of one row never depend on the other rows of the batch, but they are not
+    the same as the ones `getCoordinates` returns, so keys derived from them are stored with `KeyCache.BATCH_DERIVATION`
+    (see `KeyCache.deriveMasterKeysBatch`) for them to be re-derived with this function.
+
+    Args:
+        params (array_like): shape (n, 11), each row holds total_time, total_samples, theta1_initial, angularVelocity_initial_1,
+            theta2_intial, angularVelocity_initial_2, mass1, mass2, length_1, length_2, gravity (the order written by `Support.writeKey`)
+        max_step (float, optional): largest integration step. Defaults to 0.01.
+
+    Raises:
+        ValueError: occurs if params is not of shape (n, 11) or a row has less than 2 samples
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: x1, y1, x2, y2 of shape (n, max(total_samples)),
+            row i holds its first total_samples[i] samples and is padded with nan after that
+    """
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    if params.ndim != 2 or params.shape[1] != 11:
+        raise ValueError("params must be of shape (n, 11)")
+
+    total_time, total_samples, the1, z1, the2, z2, m1, m2, L1, L2, g = params.T.copy()
+    total_samples = total_samples.astype(int)
+    if np.any(total_samples < 2):
+        raise ValueError("Minimum 2 samples required per pendulum")
+
+    # every sampling interval is split into the same number of equal steps no longer than max_step
+    interval = total_time / (total_samples - 1)
+    substeps = np.ceil(interval / max_step).astype(int)
+    h = interval / substeps
+    steps = (total_samples - 1) * substeps
+
+    rows = np.arange(len(params))
+    the1_samples = np.full((len(params), total_samples.max()), np.nan)
+    the2_samples = np.full((len(params), total_samples.max()), np.nan)
+    the1_samples[:, 0], the2_samples[:, 0] = the1, the2
+
+    def dSdt(the1, z1, the2, z2):
+        return (
+            z1,
+            __dz1dt(0, g, m1, m2, L1, L2, the1, the2, z1, z2),
+            z2,
+            __dz2dt(0, g, m1, m2, L1, L2, the1, the2, z1, z2),
+        )
+
+    for step in range(1, steps.max() + 1):
+        k1 = dSdt(the1, z1, the2, z2)
+        k2 = dSdt(the1 + h/2*k1[0], z1 + h/2*k1[1], the2 + h/2*k1[2], z2 + h/2*k1[3])
+        k3 = dSdt(the1 + h/2*k2[0], z1 + h/2*k2[1], the2 + h/2*k2[2], z2 + h/2*k2[3])
+        k4 = dSdt(the1 + h*k3[0], z1 + h*k3[1], the2 + h*k3[2], z2 + h*k3[3])
+        the1 = the1 + h/6*(k1[0] + 2*k2[0] + 2*k3[0] + k4[0])
+        z1 = z1 + h/6*(k1[1] + 2*k2[1] + 2*k3[1] + k4[1])
+        the2 = the2 + h/6*(k1[2] + 2*k2[2] + 2*k3[2] + k4[2])
+        z2 = z2 + h/6*(k1[3] + 2*k2[3] + 2*k3[3] + k4[3])
+
+        sampled = (step % substeps == 0) & (step <= steps)
+        the1_samples[rows[sampled], step // substeps[sampled]] = the1[sampled]
+        the2_samples[rows[sampled], step // substeps[sampled]] = the2[sampled]
+
+    L1, L2 = L1[:, None], L2[:, None]
+    x1 = L1 * np.sin(the1_samples)
+    y1 = -L1 * np.cos(the1_samples)
+    x2 = L1 * np.sin(the1_samples) + L2 * np.sin(the2_samples)
+    y2 = -L1 * np.cos(the1_samples) - L2 * np.cos(the2_samples)
+
+    return x1, y1, x2, y2
+
+
+def __main():
+    # checks that the generated equations produce bit-identical trajectories to the symbolic derivation
+    from scipy.integrate import odeint
+
+    dz1dt_f, dz2dt_f = deriveEquations()
+
+    def dSdt(S, t, g, m1, m2, L1, L2):
+        the1, z1, the2, z2 = S
+        return [
+            z1,
+            dz1dt_f(t, g, m1, m2, L1, L2, the1, the2, z1, z2),
+            z2,
+            dz2dt_f(t, g, m1, m2, L1, L2, the1, the2, z1, z2),
+        ]
+
+    ans = odeint(dSdt, y0=[1, -3, -1, 5], t=np.linspace(0, 40, 1001), args=(9.81, 2, 1, 2, 1))
+    x1, y1, x2, y2 = getCoordinates()
+
+    if np.array_equal(x1, 2 * np.sin(ans.T[0])) and np.array_equal(y2, -2 * np.cos(ans.T[0]) - np.cos(ans.T[2])):
+        print("GENERATED EQUATIONS MATCH THE SYMBOLIC DERIVATION!!")
+    else:
+        print("ERROR!!!!")
+        exit(1)
+
+
+if __name__ == "__main__":
+    __main()
@@ -0,0 +1,223 @@
+"""
+Encryption and decryption requests as served by encryptionScript.py, decryptionScript.py and workerScript.py
+"""
+import os
+from itertools import chain
+from . import AES, Compression, KeyCache, KeyStore, Support, Timing
+
+ENCRYTED_IMAGE_DIR = "Encrypted"
+DECRYTED_IMAGE_DIR = "Decrypted"
+KEY_DIR = "Keys"
+
+# images with more pixels and payloads or encrypted images with more bytes than this are encrypted and decrypted
+# strip-wise (see `Support.imageStrips`), holding only one strip in memory
+STRIP_THRESHOLD = 2**26
+
+
+def isStoredKey(keyName: str|None, keyStore: KeyStore.KeyStore|None) -> bool:
+    """whether `keyName` is the id of a key in the key store written as "ks:<id>" (see `KeyStore.KEY_PREFIX`) rather than a key file"""
+    if keyStore is None or keyName is None or not keyName.startswith(KeyStore.KEY_PREFIX):
+        return False
+    keyId = keyName[len(KeyStore.KEY_PREFIX):]
+    return keyId.isdigit() and int(keyId) < len(keyStore)
+
+
+def readKeyParams(keyName: str, keyStore: KeyStore.KeyStore|None = None) -> list[float]:
+    """returns the initial conditions of a key store id or a key file, in the order written by `Support.writeKey`,
+    followed by the derivation of keys not derived by odeint"""
+    if isStoredKey(keyName, keyStore):
+        return keyStore.get(int(keyName[len(KeyStore.KEY_PREFIX):]))
+    return Support.readKey(keyName)
+
+
+def timeRequest(handler, *args, **kwargs) -> dict:
+    """calls the request handler with the given arguments while recording its stages (see `Timing.stage`),
+    the milliseconds spent in every stage are added to the response body under "timings"."""
+    with Timing.recordStages() as timings, Timing.stage("total"):
+        responseBody = handler(*args, **kwargs)
+    responseBody["timings"] = {name: round(seconds * 1000, 3) for name, seconds in timings.items()}
+    return responseBody
+
+
+def newKey(keyStore: KeyStore.KeyStore|None = None) -> str:
+    """generates new initial conditions and stores them in the key store or in a new file in KEY_DIR
+
+    Args:
+        keyStore (KeyStore.KeyStore | None, optional): store to add the key to. Defaults to None.
+
+    Returns:
+        str: id of the key in the key store as "ks:<id>" or path of the key file
+    """
+    total_time, total_samples, theta1_initial, theta2_intial, angularVelocity_initial_1, angular_velocity_initial_2, mass1, mass2, length_1, length_2, gravity = Support.generateInitialConditions()
+
+    if keyStore is not None:
+        return KeyStore.KEY_PREFIX + str(keyStore.add([total_time, total_samples, theta1_initial, angularVelocity_initial_1, theta2_intial, angular_velocity_initial_2, mass1, mass2, length_1, length_2, gravity]))
+
+    os.makedirs(KEY_DIR, exist_ok=True)
+    keyFileName = Support.uniqueFilePath(f"./{KEY_DIR}", "key_")
+    Support.writeKey(keyFileName, total_time, total_samples, theta1_initial,  angularVelocity_initial_1, theta2_intial, angular_velocity_initial_2, mass1, mass2, length_1, length_2, gravity)
+    return keyFileName
+
+
+def compressPayload(byteData: bytes|bytearray, codec: str, level: int|None = None) -> bytes|bytearray:
+    """compresses the payload after its type byte (see `Compression.compress`) and records the codec in the upper 4 bits
+    of the type byte, the payload is returned unchanged if compressing it does not pay off"""
+    with Timing.stage("compress"):
+        codecId, compressed = Compression.compress(memoryview(byteData)[1:], codec, level)
+    if codecId == 0:
+        return byteData
+    return bytes([byteData[0] | codecId << 4]) + compressed
+
+
+def encryptRequest(
+    data_value: str, data_type: str, keyFileName: str|None = None, keyCache: KeyCache.KeyCache|None = None, keyStore: KeyStore.KeyStore|None = None,
+    compression: str|None = None, compressionLevel: int|None = None
+) -> dict:
+    """encrypts the text or image into an image stored in ENCRYTED_IMAGE_DIR
+
+    Args:
+        data_value (str): text to encrypt or path of the image to encrypt
+        data_type (str): "text", "image" to encrypt the decoded pixels or "image_file" to encrypt the image file verbatim
+        keyFileName (str | None, optional): existing key file or "ks:<id>" key store id to use, a new key is generated if None or missing. Defaults to None.
+        keyCache (KeyCache.KeyCache | None, optional): cache to derive the master key through. Defaults to None.
+        keyStore (KeyStore.KeyStore | None, optional): store to add new keys to, they are written to a file in KEY_DIR if None. Defaults to None.
+        compression (str | None, optional): codec of `Compression.CODECS` to compress the payload with before encrypting it,
+            images encrypted strip-wise are never compressed. Defaults to None.
+        compressionLevel (int | None, optional): level of the codec, its default if None. Defaults to None.
+
+    Returns:
+        dict: response body with the path of the encrypted image and the key file or key store id
+    """
+    if data_type in ("image", "image_file") and not os.path.isfile(data_value):
+        return {"success": False, "message": f"data_value must be a image file for data_type = '{data_type}'"}
+
+    #--------------------------CHECKING IF REQUIRED DIRECTORIES EXIST----------------------------#
+    os.makedirs(ENCRYTED_IMAGE_DIR, exist_ok=True)
+    #--------------------------CHECKING IF REQUIRED DIRECTORIES EXIST----------------------------#
+
+    if compression:
+        try:
+            Compression.checkCodec(compression)  # before a key is generated for nothing
+        except ValueError as eobj:
+            return {"success": False, "message": str(eobj)}
+
+    #----------------------------------------------CHECKING IF INITIAL CONDITIONS NEED TO BE GENERATED OR NOT-----------------------------------------------#
+    if not (isStoredKey(keyFileName, keyStore) or keyFileName is not None and os.path.isfile(keyFileName)):
+        keyFileName = newKey(keyStore)
+    params = readKeyParams(keyFileName, keyStore)
+    #----------------------------------------------CHECKING IF INITIAL CONDITIONS NEED TO BE GENERATED OR NOT-----------------------------------------------#
+
+    keyCache = keyCache or KeyCache.KeyCache()
+    masterKey = keyCache.masterKey(params)  # with the derivation of batch-generated keys, see `KeyCache.deriveMasterKey`
+
+    try:
+        strips = None
+        if data_type == "text":
+            byteData = bytes([0]) + bytes(data_value, "utf-8")  # 0 to indicate type text
+            filename = ""
+        elif data_type == "image_file":
+            byteData = Support.fileToBytes(data_value, prefix=bytes([2]))  # 2 to indicate the encoded image file
+            filename = data_value.rsplit(".", 1)[0].rsplit("/", 1)[-1]
+        else:
+            filename = data_value.rsplit(".", 1)[0].rsplit("/", 1)[-1]  # -1 to choose just the filename and not its path
+            width, height = Support.imageSize(data_value)
+            if max(width, height) > 0xFFFF or width * height > STRIP_THRESHOLD:
+                # 3 to indicate type image with the 32 bit sizes of the v2 header
+                length, strips = Support.imageStrips(data_value, prefix=bytes([3]))
+            else:
+                byteData = Support.imageToBytes(data_value, prefix=bytes([1]))  # 1 to indicate type image
+
+        filename = Support.uniqueFilePath(f"./{ENCRYTED_IMAGE_DIR}", f"{filename}-", ".png")
+        if strips is not None:
+            AES.encryptStreamToImage(strips, length, masterKey, filename)
+        else:
+            if compression:
+                byteData = compressPayload(byteData, compression, compressionLevel)
+
+            if len(byteData) > STRIP_THRESHOLD:
+                # written unfiltered so that it is decrypted strip-wise as well
+                AES.encryptStreamToImage([byteData], len(byteData), masterKey, filename)
+            else:
+                AES.encryptToImage(byteData, masterKey, filename)
+
+        responseBody = {
+            "success": True,
+            "filepath": filename,
+            "key": keyFileName
+        }
+    except Exception as eobj:
+        responseBody = {
+            "success": False,
+            "message": f"Exeption ocurred with message {eobj}"
+        }
+
+    return responseBody
+
+
+def decryptRequest(
+    encrytedImg: str, keyFile: str, keyCache: KeyCache.KeyCache|None = None, keyStore: KeyStore.KeyStore|None = None, workers: int|None = 1
+) -> dict:
+    """decrypts the image encrypted by `encryptRequest`, images are stored in DECRYTED_IMAGE_DIR
+
+    Args:
+        encrytedImg (str): path of the encrypted image
+        keyFile (str): path of the key file or "ks:<id>" key store id used for encryption
+        keyCache (KeyCache.KeyCache | None, optional): cache to derive the master key through. Defaults to None.
+        keyStore (KeyStore.KeyStore | None, optional): store to look key ids up in. Defaults to None.
+        workers (int | None, optional): number of threads to decrypt with, see `AES.decrypt`. Defaults to 1.
+
+    Returns:
+        dict: response body with the decrypted text or the path of the decrypted image
+    """
+    if not (isStoredKey(keyFile, keyStore) or os.path.isfile(keyFile)) or not os.path.isfile(encrytedImg):
+        return {"success": False, "message": "encrypted image and key file must be existing files"}
+
+    os.makedirs(DECRYTED_IMAGE_DIR, exist_ok=True)
+
+    keyCache = keyCache or KeyCache.KeyCache()
+    masterKey = keyCache.masterKey(readKeyParams(keyFile, keyStore))
+
+    responseBody = {}
+
+    try:
+        width, height = Support.imageSize(encrytedImg)
+        if width * height > STRIP_THRESHOLD:
+            msgChunks = AES.decryptStreamFromImage(encrytedImg, masterKey)
+            decryptedBytes = next(msgChunks, b"")
+            if decryptedBytes[:1] == bytes([3]):
+                # the image is written while it is decrypted
+                responseBody["filepath"] = Support.stripsToImage(chain([decryptedBytes[1:]], msgChunks), DECRYTED_IMAGE_DIR)
+                responseBody["success"] = True
+                return responseBody
+            decryptedBytes += b"".join(msgChunks)
+        else:
+            decryptedBytes = AES.decryptFromImage(encrytedImg, masterKey, workers)
+
+        data_type, codecId = decryptedBytes[0] & 0x0F, decryptedBytes[0] >> 4  # codec of the compression in the upper 4 bits
+
+        payload = memoryview(decryptedBytes)[1:]
+        if codecId:
+            with Timing.stage("decompress"):
+                payload = Compression.decompress(payload, codecId)
+
+        if data_type == 1: # image
+            imageFileName = Support.bytesToImage(payload, DECRYTED_IMAGE_DIR)
+            responseBody["filepath"] = imageFileName
+            responseBody["success"] = True
+        elif data_type == 3: # image with the v2 header
+            responseBody["filepath"] = Support.stripsToImage([payload], DECRYTED_IMAGE_DIR)
+            responseBody["success"] = True
+        elif data_type == 2: # image file
+            responseBody["filepath"] = Support.bytesToFile(payload, DECRYTED_IMAGE_DIR)
+            responseBody["success"] = True
+        elif data_type == 0: # text
+            responseBody["data"] = (bytes([data_type]) + payload).__str__()
+            responseBody["success"] = True
+        else:
+            responseBody["message"] = "Something Invalid Happened"
+            responseBody["success"] = False
+    except Exception as eobj:
+        responseBody["message"] = f"Exeption ocurred with message {eobj}"
+        responseBody["success"] = False
+
+    return responseBody
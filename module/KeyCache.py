@@ -0,0 +1,218 @@
+"""
+Cache of the AES master keys derived from the initial conditions stored in the key files
+"""
+import hashlib
+import hmac
+import os
+import struct
+from collections import OrderedDict
+from . import AES, Timing
+
+
+# how a key's master key is derived from its initial conditions, recorded as an optional 12th value after them.
+# keys without it were derived by odeint, the batch integrator of `deriveMasterKeysBatch` gives other trajectories
+ODEINT_DERIVATION = 0
+BATCH_DERIVATION = 1
+
+
+def deriveMasterKey(params: list[float]) -> bytes:
+    """Derives the AES master key from the 11 initial conditions by integrating the double pendulum
+
+    Args:
+        params (list[float]): initial conditions in the order written by `Support.writeKey`,
+            optionally followed by the derivation (ODEINT_DERIVATION if missing)
+
+    Raises:
+        ValueError: if the derivation is unknown
+
+    Returns:
+        bytes: the master key
+    """
+    from . import DoublePendulum  # numpy and scipy are not needed when every key is a cache hit
+
+    derivation = int(params[11]) if len(params) > 11 else ODEINT_DERIVATION
+    if derivation == BATCH_DERIVATION:
+        x1, y1, x2, y2 = DoublePendulum.getCoordinatesBatch([params[:11]])
+        return AES.masterKeyBatch(x1, x2, y1, y2, [params[1]])[0]
+    if derivation != ODEINT_DERIVATION:
+        raise ValueError(f"unknown key derivation {derivation}")
+
+    total_time, total_samples, *conditions = params[:11]
+    sampleIndices = AES.keySampleIndices(int(total_samples))
+    x1, x2, y1, y2 = DoublePendulum.getCoordinates(total_time, int(total_samples), *conditions, sample_indices=sampleIndices)
+    return AES.masterKey(x1, x2, y1, y2, int(total_samples))
+
+
+def deriveMasterKeysBatch(paramsList: list[list[float]]) -> tuple[list[list[float]], list[bytes]]:
+    """Derives the master keys of many initial conditions at once with `DoublePendulum.getCoordinatesBatch`.
+    Its trajectories differ from the ones of odeint, so the returned parameters end with BATCH_DERIVATION and have to be
+    stored that way (`Support.writeKey(..., derivation=...)` or `KeyStore.add`) for `deriveMasterKey` to derive the same keys.
+
+    Args:
+        paramsList (list[list[float]]): the 11 initial conditions of every key in the order written by `Support.writeKey`
+
+    Returns:
+        tuple[list[list[float]], list[bytes]]: the parameters to store and the master key of every key
+    """
+    from . import DoublePendulum
+
+    params = [list(map(float, row[:11])) for row in paramsList]
+    x1, y1, x2, y2 = DoublePendulum.getCoordinatesBatch(params)
+    keys = AES.masterKeyBatch(x1, x2, y1, y2, [row[1] for row in params])
+    return [row + [BATCH_DERIVATION] for row in params], keys
+
+
+class KeyCache:
+    """Caches master keys by a hash of the initial conditions, so a known key never integrates the pendulum again.
+    Keys are kept in an in-process LRU and, if `cacheDir` is given, in one small file per key on disk.
+
+    Args:
+        maxEntries (int, optional): maximum number of keys kept in memory. Defaults to 1024.
+        cacheDir (str | None, optional): directory to persist the keys in, nothing is stored on disk if None. Defaults to None.
+        maxDiskBytes (int, optional): the oldest used files are removed once the cache files exceed this size. Defaults to 1 MiB.
+        secret (bytes | None, optional): if given, the files are encrypted with AES-GCM under a key derived from it
+            and named by an HMAC of the initial conditions instead of a plain hash. Defaults to None.
+    """
+
+    def __init__(self, maxEntries: int = 1024, cacheDir: str|None = None, maxDiskBytes: int = 2**20, secret: bytes|None = None) -> None:
+        self.maxEntries = maxEntries
+        self.cacheDir = cacheDir
+        self.maxDiskBytes = maxDiskBytes
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._diskBytes: int|None = None
+
+        if secret:
+            self._nameKey = hmac.new(secret, b"name", hashlib.sha256).digest()
+            self._encryptionKey = hmac.new(secret, b"encryption", hashlib.sha256).digest()
+        else:
+            self._nameKey = self._encryptionKey = None
+
+        if cacheDir and not os.path.isdir(cacheDir):
+            os.makedirs(cacheDir)
+
+    @classmethod
+    def fromEnvironment(cls) -> "KeyCache":
+        """Creates a cache that stores keys on disk only if KEY_CACHE_DIR is set, KEY_CACHE_SECRET encrypts them at rest"""
+        return cls(cacheDir=os.environ.get("KEY_CACHE_DIR"), secret=os.environ.get("KEY_CACHE_SECRET", "").encode() or None)
+
+    def _entryName(self, params: list[float]) -> str:
+        data = struct.pack(f"<{len(params)}d", *params)  # keys without a derivation keep their names of before
+        if self._nameKey:
+            return hmac.new(self._nameKey, data, hashlib.sha256).hexdigest()
+        return hashlib.sha256(data).hexdigest()
+
+    def get(self, params: list[float]) -> bytes|None:
+        """Returns the cached master key of the initial conditions or None if it is not cached"""
+        name = self._entryName(params)
+        if name in self._memory:
+            self._memory.move_to_end(name)
+            return self._memory[name]
+
+        key = self._readFile(name)
+        if key is not None:
+            self._remember(name, key)
+        return key
+
+    def put(self, params: list[float], key: bytes) -> None:
+        """Caches the master key of the initial conditions"""
+        name = self._entryName(params)
+        self._remember(name, key)
+        self._writeFile(name, key)
+
+    def masterKey(self, params: list[float]) -> bytes:
+        """Returns the master key of the initial conditions, deriving and caching it if it is not cached yet
+
+        Args:
+            params (list[float]): initial conditions in the order written by `Support.writeKey`
+
+        Returns:
+            bytes: the master key
+        """
+        with Timing.stage("keyCacheLookup"):
+            key = self.get(params)
+        if key is None:
+            with Timing.stage("keyDerivation"):
+                key = deriveMasterKey(params)
+            self.put(params, key)
+        return key
+
+    def _remember(self, name: str, key: bytes) -> None:
+        self._memory[name] = key
+        self._memory.move_to_end(name)
+        while len(self._memory) > self.maxEntries:
+            self._memory.popitem(last=False)
+
+    def _readFile(self, name: str) -> bytes|None:
+        if not self.cacheDir:
+            return None
+
+        path = os.path.join(self.cacheDir, name)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return None
+
+        if self._encryptionKey:
+            from Crypto.Cipher import AES as AESCipher
+
+            nonce, tag, cipherKey = data[:16], data[16:32], data[32:]
+            try:
+                data = AESCipher.new(self._encryptionKey, AESCipher.MODE_GCM, nonce=nonce).decrypt_and_verify(cipherKey, tag)
+            except ValueError:
+                # written under another secret or tampered with, dropping it so it gets derived again
+                os.remove(path)
+                return None
+
+        # marking the entry as recently used for the eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # evicted by another process in the meantime
+        return data
+
+    def _writeFile(self, name: str, key: bytes) -> None:
+        if not self.cacheDir:
+            return
+
+        data = key
+        if self._encryptionKey:
+            from Crypto.Cipher import AES as AESCipher
+
+            cipher = AESCipher.new(self._encryptionKey, AESCipher.MODE_GCM)
+            cipherKey, tag = cipher.encrypt_and_digest(key)
+            data = cipher.nonce + tag + cipherKey
+
+        path = os.path.join(self.cacheDir, name)
+        if self._diskBytes is None:
+            self._evictFiles()
+        if os.path.isfile(path):
+            self._diskBytes -= os.path.getsize(path)
+
+        # writing to a temporary file first so a concurrent reader never sees a partial key
+        with open(f"{path}.tmp{os.getpid()}", "wb") as file:
+            file.write(data)
+        os.replace(f"{path}.tmp{os.getpid()}", path)
+        self._diskBytes += len(data)
+
+        if self._diskBytes > self.maxDiskBytes:
+            self._evictFiles()
+
+    def _evictFiles(self) -> None:
+        entries = []
+        for entry in os.scandir(self.cacheDir):
+            try:
+                entries.append((entry.stat().st_mtime, entry.stat().st_size, entry.path))
+            except FileNotFoundError:
+                pass  # removed by another process sharing the directory
+
+        entries.sort()
+        self._diskBytes = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._diskBytes <= self.maxDiskBytes:
+                break
+            self._diskBytes -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
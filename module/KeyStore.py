@@ -0,0 +1,186 @@
+"""
+Binary store of the initial conditions of many keys in a single file instead of one text file per key.
+
+The file starts with a 16 byte header (magic, format version, record size) followed by fixed size records
+of the 11 initial conditions as little endian doubles, in the order written by `Support.writeKey`. Version 2 records
+also hold the derivation of the key (see `KeyCache.deriveMasterKey`) as a 12th double, version 1 stores are still read.
+The id of a key is the index of its record, so a lookup is a single offset computation into the memory mapped file.
+Scripts and requests name stored keys "ks:<id>" (see KEY_PREFIX) so that they are never mistaken for key files.
+"""
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+from . import KeyCache, Support
+
+# prefix of the key ids handed out by the scripts, e.g. "ks:5" for the key with id 5
+KEY_PREFIX = "ks:"
+MAGIC = b"DPKS"
+VERSION = 2
+HEADER = struct.Struct("<4sHH8x")
+RECORDS = {1: struct.Struct("<11d"), 2: struct.Struct("<12d")}
+RECORD = RECORDS[VERSION]
+
+
+class KeyStore:
+    """Appends and looks up the initial conditions of keys in the binary key store at `path`, creating it if missing.
+    Appends take an exclusive lock on the file, so processes sharing a store never hand out the same id twice.
+
+    Args:
+        path (str): path of the key store file
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = open(path, "a+b")
+        self._map: mmap.mmap|None = None
+
+        with self._locked():
+            self._file.seek(0, os.SEEK_END)
+            if self._file.tell() == 0:
+                self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+                self._file.flush()
+
+        self._file.seek(0)
+        magic, version, recordSize = HEADER.unpack(self._file.read(HEADER.size))
+        if magic != MAGIC or version not in RECORDS or recordSize != RECORDS[version].size:
+            self._file.close()
+            raise ValueError(f"{path} is not a version {' or '.join(map(str, RECORDS))} key store")
+        self._record = RECORDS[version]
+
+    @classmethod
+    def fromEnvironment(cls) -> "KeyStore|None":
+        """Opens the key store at KEY_STORE, returns None if it is not set so one key file per key is used instead"""
+        path = os.environ.get("KEY_STORE")
+        return cls(path) if path else None
+
+    def __len__(self) -> int:
+        return (os.fstat(self._file.fileno()).st_size - HEADER.size) // self._record.size
+
+    def __getitem__(self, keyId: int) -> list[float]:
+        return self.get(keyId)
+
+    def __enter__(self) -> "KeyStore":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        try:
+            import fcntl
+        except ImportError:  # Windows
+            import msvcrt
+
+            # msvcrt locks byte ranges from the current position, locking the first byte stands for the whole file.
+            # LK_LOCK retries for about 10 seconds before raising OSError
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            return
+
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def add(self, params: Iterable[float]) -> int:
+        """Appends the initial conditions of one key and returns its id"""
+        return self.addMany([params])[0]
+
+    def addMany(self, paramsList: Iterable[Iterable[float]]) -> range:
+        """Appends the initial conditions of many keys with a single write
+
+        Args:
+            paramsList (Iterable[Iterable[float]]): initial conditions in the order written by `Support.writeKey`,
+                optionally followed by their derivation as returned by `KeyCache.deriveMasterKeysBatch`
+
+        Raises:
+            ValueError: if a version 1 store is given keys not derived by odeint
+
+        Returns:
+            range: ids of the appended keys, in the order they were given
+        """
+        data = b"".join(self._record.pack(*self.__recordValues(list(params))) for params in paramsList)
+
+        with self._locked():
+            self._file.seek(0, os.SEEK_END)
+            firstId = (self._file.tell() - HEADER.size) // self._record.size
+            self._file.write(data)
+            self._file.flush()
+
+        return range(firstId, firstId + len(data) // self._record.size)
+
+    def __recordValues(self, params: list[float]) -> list[float]:
+        derivation = params[11] if len(params) > 11 else KeyCache.ODEINT_DERIVATION
+        if self._record is RECORDS[1]:
+            if derivation != KeyCache.ODEINT_DERIVATION:
+                raise ValueError(f"{self.path} is a version 1 key store, which only holds keys derived by odeint")
+            return params[:11]
+        return params[:11] + [derivation]
+
+    def get(self, keyId: int) -> list[float]:
+        """Returns the initial conditions of the key `keyId` in the order written by `Support.writeKey`,
+        followed by their derivation unless it is KeyCache.ODEINT_DERIVATION
+
+        Raises:
+            KeyError: if no key has the given id
+        """
+        offset = HEADER.size + keyId * self._record.size
+        if keyId < 0:
+            raise KeyError(keyId)
+
+        if self._map is None or offset + self._record.size > len(self._map):
+            # remapping once the file grew past the current mapping, appended records are never modified
+            if keyId >= len(self):
+                raise KeyError(keyId)
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        params = list(self._record.unpack_from(self._map, offset))
+        if params[11:] == [KeyCache.ODEINT_DERIVATION]:
+            del params[11:]  # the same as the key file of the key, so it has the same key cache entry
+        return params
+
+    def importKeyFiles(self, keyFileNames: Iterable[str]) -> dict[str, int]:
+        """Imports key files written by `Support.writeKey` in bulk
+
+        Args:
+            keyFileNames (Iterable[str]): paths of the key files
+
+        Returns:
+            dict[str, int]: id of every imported key file by its path
+        """
+        keyFileNames = list(keyFileNames)
+        keyIds = self.addMany(Support.readKey(keyFileName) for keyFileName in keyFileNames)
+        return dict(zip(keyFileNames, keyIds))
+
+
+def __main():
+    import sys
+
+    if len(sys.argv) < 3:
+        print("[Usage]: python -m module.KeyStore <key_store> <key_file> [<key_file> ...]")
+        exit(1)
+
+    with KeyStore(sys.argv[1]) as keyStore:
+        for keyFileName, keyId in keyStore.importKeyFiles(sys.argv[2:]).items():
+            print(f"{KEY_PREFIX}{keyId}\t{keyFileName}")
+
+
+if __name__ == "__main__":
+    __main()
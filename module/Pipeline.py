@@ -0,0 +1,180 @@
+"""
+In-memory version of the encryption and decryption requests of `Handlers`.
+
+The inputs are bytes or file-like objects, the encrypted image is returned as the bytes of the encoded image and the
+decrypted data as text, a PIL image or the bytes of the image file, so nothing is written to disk unless `Decrypted.save`
+is called. The payloads are the same as the ones of `Handlers`, so images encrypted by either are decrypted by both.
+
+    masterKey = KeyCache.KeyCache().masterKey(Support.readKey("Keys/key_..."))
+    with open("photo.jpg", "rb") as photo:
+        encrypted = Pipeline.encryptImage(photo, masterKey)
+    decrypted = Pipeline.decrypt(encrypted, masterKey)
+    decrypted.value.show()
+"""
+import io
+from typing import TYPE_CHECKING, BinaryIO
+from . import AES, Compression, Handlers, Support, Timing
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# zlib level of decrypted images encoded as PNG, level 1 is several times faster than pillow's default of 6
+FAST_COMPRESS_LEVEL = 1
+
+
+class Decrypted:
+    """Decrypted data as returned by `decrypt`
+
+    Args:
+        data_type (str): "text", "image" or "image_file", the data types of `Handlers.encryptRequest`
+        value (str | Image.Image | bytes): the text, the image or the bytes of the image file
+        ext (str, optional): extension of the image file. Defaults to "".
+    """
+
+    def __init__(self, data_type: str, value: "str|Image.Image|bytes", ext: str = "") -> None:
+        self.data_type = data_type
+        self.value = value
+        self.ext = ext
+
+    def encode(self, format: str = "PNG", compressLevel: int = FAST_COMPRESS_LEVEL) -> bytes:
+        """returns the image encoded in `format` (PNGs at zlib level `compressLevel`) or the image file as it was encrypted
+
+        Raises:
+            ValueError: if the decrypted data is text
+        """
+        if self.data_type == "image_file":
+            return self.value
+        if self.data_type != "image":
+            raise ValueError("only images and image files can be encoded")
+
+        output = io.BytesIO()
+        with Timing.stage("imageEncode"):
+            if format.upper() == "PNG":
+                self.value.save(output, format=format, compress_level=compressLevel)
+            else:
+                self.value.save(output, format=format)
+        return output.getvalue()
+
+    def save(self, directory: str, compressLevel: int = FAST_COMPRESS_LEVEL) -> str:
+        """writes the image as PNG or the image file with its own extension to a new file in `directory`, like `Handlers.decryptRequest`
+
+        Returns:
+            str: path of the written file
+        """
+        if self.data_type not in ("image", "image_file"):
+            raise ValueError("only images and image files can be saved")
+
+        filepath = Support.uniqueFilePath(directory, ext=f".{self.ext if self.data_type == 'image_file' else 'png'}")
+        if self.data_type == "image":
+            with Timing.stage("imageEncode"):
+                self.value.save(filepath, compress_level=compressLevel)
+        else:
+            with Timing.stage("fileWrite"), open(filepath, "wb") as file:
+                file.write(self.value)
+        return filepath
+
+
+def encryptPayload(
+    payload: bytes|bytearray, masterKey: bytes, compression: str|None = None, compressionLevel: int|None = None,
+    format: str = "PNG", compressLevel: int = 0
+) -> bytes:
+    """encrypts a payload starting with its data type byte (see `Handlers.encryptRequest`) into an encoded image
+
+    Args:
+        payload (bytes | bytearray): data type byte followed by the data
+        masterKey (bytes): 128/192/256 bit long key used for AES encryption
+        compression (str | None, optional): codec of `Compression.CODECS` to compress the payload with. Defaults to None.
+        compressionLevel (int | None, optional): level of the codec, its default if None. Defaults to None.
+        format (str, optional): pillow format of the image, "PNG" or an uncompressed one such as "PPM" (PGM) or "TIFF". Defaults to "PNG".
+        compressLevel (int, optional): zlib level of PNGs, cipher text does not compress so 0 only stores it. Defaults to 0.
+
+    Returns:
+        bytes: the encoded image
+    """
+    if compression:
+        payload = Handlers.compressPayload(payload, compression, compressionLevel)
+
+    output = io.BytesIO()
+    AES.encryptToImage(payload, masterKey, output, compressLevel, format)
+    return output.getvalue()
+
+
+def encryptText(text: str, masterKey: bytes, **options) -> bytes:
+    """encrypts the text into an encoded image, `options` are the keyword arguments of `encryptPayload`"""
+    return encryptPayload(bytes([0]) + bytes(text, "utf-8"), masterKey, **options)
+
+
+def encryptImage(image: "Image.Image|bytes|BinaryIO", masterKey: bytes, **options) -> bytes:
+    """encrypts the pixels of the image into an encoded image, `options` are the keyword arguments of `encryptPayload`
+
+    Args:
+        image (Image.Image | bytes | BinaryIO): the image, or the bytes of an image file or a file-like object to decode it from
+        masterKey (bytes): 128/192/256 bit long key used for AES encryption
+
+    Returns:
+        bytes: the encoded image
+    """
+    from PIL import Image
+
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        image = io.BytesIO(image)
+    if not isinstance(image, Image.Image):
+        image = Image.open(image)
+
+    # images wider or higher than 65535 pixels use the 32 bit sizes of the v2 header
+    headerV2 = max(image.size) > 0xFFFF
+    payload = Support.imageToBytes(img=image, prefix=bytes([3 if headerV2 else 1]), headerV2=headerV2)
+    return encryptPayload(payload, masterKey, **options)
+
+
+def encryptImageFile(imageFile: bytes|BinaryIO, ext: str, masterKey: bytes, **options) -> bytes:
+    """encrypts the image file verbatim into an encoded image, `options` are the keyword arguments of `encryptPayload`
+
+    Args:
+        imageFile (bytes | BinaryIO): the bytes of the image file or a file-like object to read it from
+        ext (str): extension of the image file, used when it is saved after decryption
+        masterKey (bytes): 128/192/256 bit long key used for AES encryption
+
+    Returns:
+        bytes: the encoded image
+    """
+    if isinstance(imageFile, (bytes, bytearray, memoryview)):
+        imageFile = io.BytesIO(imageFile)
+    return encryptPayload(Support.fileToBytes(imageFile, prefix=bytes([2]), ext=ext), masterKey, **options)
+
+
+def decrypt(encrypted: "bytes|BinaryIO|Image.Image", masterKey: bytes, workers: int|None = 1) -> Decrypted:
+    """decrypts an image encrypted by this module or by `Handlers.encryptRequest`
+
+    Args:
+        encrypted (bytes | BinaryIO | Image.Image): the bytes of the encoded image, a file-like object to read it from or the image itself
+        masterKey (bytes): 128/192/256 bit long sequence used to encrypt the message
+        workers (int | None, optional): number of threads to decrypt with, see `AES.decrypt`. Defaults to 1.
+
+    Raises:
+        ValueError: if the key is wrong or the payload is invalid
+
+    Returns:
+        Decrypted: the decrypted text, image or image file
+    """
+    if isinstance(encrypted, (bytes, bytearray, memoryview)):
+        encrypted = io.BytesIO(encrypted)
+
+    decryptedBytes = AES.decryptFromImage(encrypted, masterKey, workers)
+    if not decryptedBytes:
+        raise ValueError("empty payload")
+    data_type, codecId = decryptedBytes[0] & 0x0F, decryptedBytes[0] >> 4
+
+    payload = memoryview(decryptedBytes)[1:]
+    if codecId:
+        with Timing.stage("decompress"):
+            payload = Compression.decompress(payload, codecId)
+
+    if data_type == 0:
+        return Decrypted("text", str(payload, "utf-8"))
+    if data_type in (1, 3):
+        return Decrypted("image", Support.imageFromBytes(payload, headerV2=data_type == 3))
+    if data_type == 2:
+        ext, fileData = Support.fileFromBytes(payload)
+        return Decrypted("image_file", bytes(fileData), ext)
+    raise ValueError(f"unknown data type {data_type}")
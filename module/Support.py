@@ -1,9 +1,26 @@
 
+import os
 import random
+import struct
+import threading
+import uuid
+import zlib
 from datetime import datetime
+from itertools import chain
 from math import pi
-from PIL import Image
-import struct
+from typing import TYPE_CHECKING, BinaryIO, Iterable, Iterator
+
+try:
+    from . import Timing
+except ImportError:  # run directly as a script instead of as part of the package
+    import Timing
+
+# pillow is only imported by the image conversions so that text requests never load it
+if TYPE_CHECKING:
+    from PIL import Image
+
+# initial conditions are key material, so they come from the OS and never from a seed two processes could share
+__random = random.SystemRandom()
 
 
 def __addPadding(data: bytes, block_size: int) -> bytes:
@@ -21,21 +38,32 @@ def generateInitialConditions() -> tuple[float, float, float, float, float, floa
         tuple[int,float, float, float, float, float, float, float, float, float]: 
             total_time, theta1_initial, theta2_intial, angularVelocity_initial_1, angular_velocity_initial_2, mass1, mass2, length_1, length_2, gravity
     """
-    random.seed(datetime.now().timestamp())
-    total_time = random.randint(40, 100)                                # range - 40 to 100
-    total_samples = random.randint(4, 1000)                             # range - 4 to 1000
-    theta1_initial = (random.random() * 2 * pi) - pi	                # range - -pi to pi
-    theta2_initial = (random.random() * 2 * pi) - pi   	                # range - -pi to pi
-    angularVelocity_initial_1 = (random.random() * 10 * pi) - (5 * pi)  # range - -5pi to 5pi
-    angularVelocity_initial_2 = (random.random() * 10 * pi) - (5 * pi)  # range - -5pi to 5pi
-    mass1 = (random.random() * 9) + 1                                   # range - [1,10)
-    mass2 = (random.random() * 9) + 1                                   # range - [1,10)
-    length_1 = (random.random() * 3) + 1                                # range - [1,4)
-    length_2 = (random.random() * 3) + 1                                # range - [1,4)
-    gravity = (random.random() * 2) + 8                                 # range - [8,10)
+    total_time = __random.randint(40, 100)                                # range - 40 to 100
+    total_samples = __random.randint(4, 1000)                             # range - 4 to 1000
+    theta1_initial = (__random.random() * 2 * pi) - pi                    # range - -pi to pi
+    theta2_initial = (__random.random() * 2 * pi) - pi                    # range - -pi to pi
+    angularVelocity_initial_1 = (__random.random() * 10 * pi) - (5 * pi)  # range - -5pi to 5pi
+    angularVelocity_initial_2 = (__random.random() * 10 * pi) - (5 * pi)  # range - -5pi to 5pi
+    mass1 = (__random.random() * 9) + 1                                   # range - [1,10)
+    mass2 = (__random.random() * 9) + 1                                   # range - [1,10)
+    length_1 = (__random.random() * 3) + 1                                # range - [1,4)
+    length_2 = (__random.random() * 3) + 1                                # range - [1,4)
+    gravity = (__random.random() * 2) + 8                                 # range - [8,10)
     return total_time, total_samples, theta1_initial, theta2_initial, angularVelocity_initial_1, angularVelocity_initial_2, mass1, mass2, length_1, length_2, gravity
 
 
+def uniqueFilePath(directory: str, name: str = "", ext: str = "") -> str:
+    """returns the path of a new file in `directory` named after the current time, followed by a random uuid so that
+    processes writing in the same tick never overwrite each other's files
+
+    Args:
+        directory (str): directory of the file
+        name (str, optional): start of the file name. Defaults to "".
+        ext (str, optional): extension of the file, including its dot. Defaults to "".
+    """
+    return f"{directory}/{name}{datetime.now().timestamp()}-{uuid.uuid4().hex}{ext}"
+
+
 def sizeToByte(size: tuple[int, int]) -> bytes:
     """Returns 4 bytes containing the dimensions provided
 
@@ -58,49 +86,551 @@ def byteToSize(size: bytes) -> tuple[int, int]:
     return height, width
 
 
-def imageToBytes(filepath: str|None = None, img: Image.Image|None = None) -> bytes:
-    """converts image to bytes sequence
+def sizeToByteV2(size: tuple[int, int]) -> bytes:
+    """Returns 8 bytes containing the dimensions provided, 4 big endian bytes per side for images wider or higher than 65535 pixels"""
+    width, height = size
+    return width.to_bytes(4, "big") + height.to_bytes(4, "big")
+
+
+def byteToSizeV2(size: bytes) -> tuple[int, int]:
+    return int.from_bytes(size[0:4], "big"), int.from_bytes(size[4:8], "big")
+
+
+def imageToBytes(filepath: str|None = None, img: "Image.Image|None" = None, prefix: bytes = b"", headerV2: bool = False) -> bytearray:
+    """converts image to bytes sequence, the header and the pixels are written straight into one preallocated buffer
 
     Args:
         filepath (str): path of the image to convert
+        img (Image.Image | None, optional): image to convert instead of a file. Defaults to None.
+        prefix (bytes, optional): bytes to put before the header, e.g. the data type byte of the request. Defaults to b"".
+        headerV2 (bool, optional): store the size in the 8 bytes of the v2 header (see `imageStrips`). Defaults to False.
 
     Returns:
-        bytes: image bytes prepended image extension (6 bytes) prepended with image mode (8 Bytes) prepended with image size (4 bytes)
+        bytearray: image bytes prepended image extension (6 bytes) prepended with image mode (8 Bytes) prepended with image size (4 bytes)
     """
+    from PIL import Image
+
     if filepath:
         img = Image.open(filepath)
     elif not img:
         raise ValueError("Must provide either filepath or img")
 
-    ext = __addPadding(bytes(filepath.rsplit('.', 1)[-1], 'utf-8'), 6)
-    size = sizeToByte(img.size)
+    ext = __addPadding(bytes(filepath.rsplit('.', 1)[-1] if filepath else (img.format or "").lower(), 'utf-8'), 6)
+    size = sizeToByteV2(img.size) if headerV2 else sizeToByte(img.size)
     mode = __addPadding(bytes(img.mode, 'utf-8'), 8)
+    header = prefix + size + mode + ext
     
-    return size + mode + ext + img.tobytes()
+    with Timing.stage("imageDecode"):  # pillow only reads and decodes the file when the pixels are accessed
+        img.load()
+        rowSize = len(img.crop((0, 0, img.width, 1)).tobytes()) if img.width and img.height else 0
+
+        imgData = bytearray(len(header) + rowSize * img.height)
+        imgData[:len(header)] = header
 
+        # copying bands of about 1 MiB of rows into the buffer, img.tobytes() would build a second copy of all the pixels
+        bandRows = max(2**20 // max(rowSize, 1), 1)
+        offset = len(header)
+        for top in range(0, img.height, bandRows):
+            band = img.crop((0, top, img.width, min(top + bandRows, img.height))).tobytes()
+            imgData[offset:offset + len(band)] = band
+            offset += len(band)
 
-def bytesToImage(imgData: bytes, imageDir: str) -> str:
-    """converts the given byte data to image by splitting it into mode, size, extension and image data
+    return imgData
+
+
+def imageFromBytes(imgData: bytes|memoryview, headerV2: bool = False) -> "Image.Image":
+    """converts the given byte data to an image by splitting it into mode, size, extension and image data.
+    The parts are memoryview slices and pillow uses the pixels in place for the modes it stores the same way, copying them otherwise.
 
     Args:
-        imgData (bytes): bytes containing size, mode, extension and data
+        imgData (bytes | memoryview): bytes containing size, mode, extension and data
+        headerV2 (bool, optional): the size is stored in the 8 bytes of the v2 header (see `imageStrips`). Defaults to False.
+
+    Returns:
+        Image.Image: the image
+    """
+    from PIL import Image
+
+    imgData = memoryview(imgData)
+    sizeLength = 8 if headerV2 else 4
+    size, mode, img_bytes = imgData[0:sizeLength], imgData[sizeLength:sizeLength + 8], imgData[sizeLength + 14:]
+
+    size = byteToSizeV2(size) if headerV2 else byteToSize(size)
+    mode = str(__removePadding(bytes(mode)), "utf-8")
+
+    return Image.frombuffer(mode, size, img_bytes, "raw", mode, 0, 1)
+
+
+def bytesToImage(imgData: bytes|memoryview, imageDir: str) -> str:
+    """converts the given byte data to image (see `imageFromBytes`) and stores it as PNG
+
+    Args:
+        imgData (bytes | memoryview): bytes containing size, mode, extension and data
         imageDir (str): directory path to store the  image in
 
     Returns:
         str : returns the relative path of the stored decrypted image
     """
-    size, mode, ext, img_bytes = imgData[0:4], imgData[4:12], imgData[12:18], imgData[18:]
+    with Timing.stage("imageEncode"):
+        img = imageFromBytes(imgData)
 
-    size = byteToSize(size)
-    mode = str(__removePadding(mode), "utf-8")
-    ext = str(__removePadding(ext), "utf-8")
-    
-    img = Image.frombytes(mode=mode, size=size, data=img_bytes)
-    
-    filepath = f"{imageDir}/{datetime.now().timestamp()}.png" 
-    # filepath = f"{imageDir}/{datetime.now().timestamp()}.{ext}" 
-    img.save(filepath)
+        filepath = uniqueFilePath(imageDir, ext=".png")
+        # filepath = f"{imageDir}/{datetime.now().timestamp()}.{ext}" 
+        img.save(filepath)
+    return filepath
+
+
+def fileToBytes(filepath: str|BinaryIO, prefix: bytes = b"", ext: str|None = None) -> bytearray:
+    """reads an encoded image file verbatim, its extension is stored in front of it the same way as in `imageToBytes`
+
+    Args:
+        filepath (str | BinaryIO): path of the image file or a file-like object to read it from
+        prefix (bytes, optional): bytes to put before the extension, e.g. the data type byte of the request. Defaults to b"".
+        ext (str | None, optional): extension of the file, taken from the path if None. Defaults to None.
+
+    Returns:
+        bytearray: file bytes prepended with the file extension (6 bytes)
+    """
+    if ext is None:
+        if not isinstance(filepath, str):
+            raise ValueError("ext must be given for file-like objects")
+        ext = filepath.rsplit('.', 1)[-1]
+    ext = __addPadding(bytes(ext.lower(), 'utf-8'), 6)
+    if len(ext) > 6:
+        raise ValueError("file extension must be at most 5 characters long")
+    header = prefix + ext
+
+    if not isinstance(filepath, str):
+        with Timing.stage("fileRead"):
+            return bytearray(header) + filepath.read()
+
+    with Timing.stage("fileRead"), open(filepath, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        fileData = bytearray(len(header) + size)
+        fileData[:len(header)] = header
+        file.readinto(memoryview(fileData)[len(header):])
+    return fileData
+
+
+def bytesToFile(fileData: bytes|memoryview, fileDir: str) -> str:
+    """writes the image file stored by `fileToBytes` back unchanged
+
+    Args:
+        fileData (bytes | memoryview): bytes containing the extension and the file
+        fileDir (str): directory path to store the file in
+
+    Returns:
+        str: returns the relative path of the stored file
+    """
+    ext, fileData = fileFromBytes(fileData)
+
+    filepath = uniqueFilePath(fileDir, ext=f".{ext}")
+    with Timing.stage("fileWrite"), open(filepath, "wb") as file:
+        file.write(fileData)
+    return filepath
+
+
+def fileFromBytes(fileData: bytes|memoryview) -> tuple[str, memoryview]:
+    """splits the bytes stored by `fileToBytes` into the file extension and the file, which is not copied"""
+    fileData = memoryview(fileData)
+    ext = str(__removePadding(bytes(fileData[0:6])), "utf-8")
+    if not ext.isalnum():
+        raise ValueError("invalid file extension")
+    return ext, fileData[6:]
+
+
+#------------------------------------------STRIP-WISE IMAGES------------------------------------------#
+# v2 image header written by `imageStrips`: size (8 bytes, see `sizeToByteV2`), mode (8 bytes) and extension (6 bytes)
+IMAGE_HEADER_V2_SIZE = 8 + 8 + 6
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+__openLock = threading.Lock()
+
+
+def __openUnchecked(filepath: str) -> "Image.Image":
+    # opens the image without pillow's decompression bomb check, only the header is read until the pixels are accessed.
+    # MAX_IMAGE_PIXELS is global, the lock keeps concurrent calls from restoring each other's value
+    from PIL import Image
+
+    with __openLock:
+        maxPixels, Image.MAX_IMAGE_PIXELS = Image.MAX_IMAGE_PIXELS, None
+        try:
+            return Image.open(filepath)
+        finally:
+            Image.MAX_IMAGE_PIXELS = maxPixels
+
+
+def imageSize(filepath: str) -> tuple[int, int]:
+    """returns the (width, height) of the image without decoding it, also for images too large for pillow to decode"""
+    with __openUnchecked(filepath) as img:
+        return img.size
+
+
+def __rawTiles(img: "Image.Image", rowSize: int) -> list[tuple[int, int]]|None:
+    # (file offset, rows) of every strip of the file if the pixels are stored exactly as img.tobytes() returns them,
+    # i.e. uncompressed full width top-down strips in the raw mode of the image (PPM/PGM and uncompressed TIFF files)
+    tiles, nextRow = [], 0
+    for tile in sorted(img.tile, key=lambda tile: tile[1][1]):
+        codec, (left, top, right, bottom), offset, args = tile[:4]
+        rawmode, stride, orientation = (args, 0, 1) if isinstance(args, str) else (tuple(args) + (0, 1))[:3]
+        if codec != "raw" or rawmode != img.mode or stride not in (0, rowSize) or orientation != 1:
+            return None
+        if left != 0 or right != img.width or top != nextRow:
+            return None
+        tiles.append((offset, bottom - top))
+        nextRow = bottom
+    return tiles if nextRow == img.height else None
+
+
+def __pixelStrips(filepath: str, img: "Image.Image", header: bytes, rowSize: int, stripSize: int) -> Iterator[bytes]:
+    from PIL import Image
+
+    with img:
+        yield header
+
+        tiles = __rawTiles(img, rowSize)
+        if tiles is not None:
+            # the strips are read from the file as they are, pillow never decodes the image
+            with open(filepath, "rb") as file:
+                for offset, rows in tiles:
+                    file.seek(offset)
+                    remaining = rows * rowSize
+                    while remaining:
+                        with Timing.stage("imageDecode"):
+                            strip = file.read(min(remaining, stripSize))
+                        if not strip:
+                            raise ValueError(f"{filepath} ends before its last pixel")
+                        remaining -= len(strip)
+                        yield strip
+            return
+
+        # compressed formats have to be decoded completely by pillow, so its limit applies to them
+        if Image.MAX_IMAGE_PIXELS and img.width * img.height > 2 * Image.MAX_IMAGE_PIXELS:
+            raise Image.DecompressionBombError(
+                f"{filepath} has {img.width * img.height} pixels, only uncompressed PPM/PGM and TIFF files "
+                f"larger than {2 * Image.MAX_IMAGE_PIXELS} pixels can be read"
+            )
+        with Timing.stage("imageDecode"):
+            img.load()
+
+        bandRows = max(stripSize // max(rowSize, 1), 1)
+        for top in range(0, img.height, bandRows):
+            with Timing.stage("imageDecode"):
+                band = img.crop((0, top, img.width, min(top + bandRows, img.height))).tobytes()
+            yield band
+
+
+def imageStrips(filepath: str, prefix: bytes = b"", stripSize: int = 2**20) -> tuple[int, Iterator[bytes]]:
+    """strip-wise version of `imageToBytes` with the v2 header, which stores each side of the image in 4 bytes.
+    Uncompressed PPM/PGM and TIFF files are read straight from the file without decoding them, so images of any size
+    are read while holding only one strip in memory. Other formats are decoded by pillow and then read in bands.
+
+    Args:
+        filepath (str): path of the image to convert
+        prefix (bytes, optional): bytes to put before the header, e.g. the data type byte of the request. Defaults to b"".
+        stripSize (int, optional): bytes per strip. Defaults to 1 MiB.
+
+    Returns:
+        tuple[int, Iterator[bytes]]: total length of the bytes and an iterator over the header followed by the pixels in strips
+    """
+    from PIL import Image
+
+    img = __openUnchecked(filepath)
+    ext = __addPadding(bytes(filepath.rsplit('.', 1)[-1], 'utf-8'), 6)
+    mode = __addPadding(bytes(img.mode, 'utf-8'), 8)
+    header = prefix + sizeToByteV2(img.size) + mode + ext
+    rowSize = len(Image.new(img.mode, (img.width, 1)).tobytes())
+
+    return len(header) + rowSize * img.height, __pixelStrips(filepath, img, header, rowSize, stripSize)
+
+
+class PngStripWriter:
+    """Writes a PNG image strip by strip, the pixels given to `write` are laid out like the bytes of `Image.tobytes()`
+    and can be split anywhere. Every row is stored unfiltered, so the image can also be read back strip-wise by `readStrips`.
+
+    Args:
+        file (BinaryIO): file to write the image to
+        size (tuple[int, int]): width and height of the image
+        mode (str): pillow mode of the pixels, one of MODES
+        compressLevel (int, optional): zlib level 0-9. Defaults to 6.
+    """
+    # PNG colour type and bit depth of the modes pillow stores the same way as a PNG
+    MODES = {"1": (0, 1), "L": (0, 8), "LA": (4, 8), "RGB": (2, 8), "RGBA": (6, 8), "I;16B": (0, 16)}
+    CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}
+
+    def __init__(self, file: BinaryIO, size: tuple[int, int], mode: str, compressLevel: int = 6) -> None:
+        if mode not in self.MODES:
+            raise ValueError(f"mode {mode} can not be written strip-wise")
+
+        colorType, bitDepth = self.MODES[mode]
+        self.width, self.height = size
+        self.rowSize = (self.width * self.CHANNELS[colorType] * bitDepth + 7) // 8
+        self._file = file
+        self._compressor = zlib.compressobj(compressLevel)
+        self._row = bytearray()  # start of a row split between two writes
+        self._rows = 0
+
+        file.write(PNG_SIGNATURE)
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", self.width, self.height, bitDepth, colorType, 0, 0, 0))
+
+    def _chunk(self, chunkType: bytes, data: bytes) -> None:
+        self._file.write(struct.pack(">I", len(data)) + chunkType)
+        self._file.write(data)
+        self._file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(chunkType))))
+
+    def write(self, data: bytes|memoryview) -> None:
+        data = memoryview(data)
+        rows = bytearray()
+        if self._row:
+            missing = self.rowSize - len(self._row)
+            self._row += data[:missing]
+            data = data[missing:]
+            if len(self._row) < self.rowSize:
+                return
+            rows += b"\x00" + self._row
+            self._row.clear()
+            self._rows += 1
+
+        complete = len(data) - len(data) % self.rowSize if self.rowSize else 0
+        for start in range(0, complete, self.rowSize):
+            rows += b"\x00"  # filter type None
+            rows += data[start:start + self.rowSize]
+        self._rows += complete // self.rowSize if self.rowSize else 0
+        self._row += data[complete:]
+
+        if self._rows > self.height or self._rows == self.height and self._row:
+            raise ValueError("more pixels written than the image holds")
+        if compressed := self._compressor.compress(rows):
+            self._chunk(b"IDAT", compressed)
+
+    def close(self) -> None:
+        """ends the image, the file itself is not closed
+
+        Raises:
+            ValueError: if fewer pixels were written than the image holds
+        """
+        if self._rows != self.height:
+            raise ValueError(f"only {self._rows} of {self.height} rows were written")
+        self._chunk(b"IDAT", self._compressor.flush())
+        self._chunk(b"IEND", b"")
+
+
+class NetpbmStripWriter:
+    """Writes a binary PGM ("L") or PPM ("RGB") image strip by strip, same interface as `PngStripWriter`"""
+    MODES = {"L": (b"P5", 1), "RGB": (b"P6", 3)}
+
+    def __init__(self, file: BinaryIO, size: tuple[int, int], mode: str) -> None:
+        if mode not in self.MODES:
+            raise ValueError(f"mode {mode} can not be written as PGM/PPM")
+
+        magic, channels = self.MODES[mode]
+        self._file = file
+        self._remaining = size[0] * size[1] * channels
+        file.write(magic + b"\n%d %d\n255\n" % size)
+
+    def write(self, data: bytes|memoryview) -> None:
+        if len(data) > self._remaining:
+            raise ValueError("more pixels written than the image holds")
+        self._file.write(data)
+        self._remaining -= len(data)
+
+    def close(self) -> None:
+        if self._remaining:
+            raise ValueError(f"{self._remaining} bytes of pixels are missing")
+
+
+def __unfilter(filterType: int, row: bytearray, previous: bytes, bpp: int) -> bytes:
+    # reverses the PNG filter of one row, rows written by `PngStripWriter` are never filtered
+    if filterType == 0:
+        return bytes(row)
+
+    import numpy as np
+
+    if filterType == 1:  # Sub, uint8 sums wrap around like the filter
+        return np.cumsum(np.frombuffer(row, dtype=np.uint8).reshape(-1, bpp), axis=0, dtype=np.uint8).tobytes()
+    if filterType == 2:  # Up
+        return (np.frombuffer(row, dtype=np.uint8) + np.frombuffer(previous, dtype=np.uint8)).tobytes()
+    if filterType not in (3, 4):
+        raise ValueError(f"invalid PNG filter type {filterType}")
+
+    # Average and Paeth depend on the already reconstructed byte to their left
+    for i in range(len(row)):
+        left = row[i - bpp] if i >= bpp else 0
+        up = previous[i]
+        if filterType == 3:
+            row[i] = (row[i] + (left + up) // 2) & 0xFF
+        else:
+            upLeft = previous[i - bpp] if i >= bpp else 0
+            estimate = left + up - upLeft
+            distLeft, distUp, distUpLeft = abs(estimate - left), abs(estimate - up), abs(estimate - upLeft)
+            predictor = left if distLeft <= distUp and distLeft <= distUpLeft else up if distUp <= distUpLeft else upLeft
+            row[i] = (row[i] + predictor) & 0xFF
+    return bytes(row)
+
+
+def __pngStrips(file: BinaryIO, stripSize: int) -> Iterator[bytes]:
+    decompressor = zlib.decompressobj()
+    pending = bytearray()  # decompressed rows, each starting with its filter type
+    rowSize = bpp = height = rows = 0
+    previous = b""
+
+    def completeRows() -> bytes:
+        nonlocal previous, rows
+        strip = bytearray()
+        start = 0
+        while len(pending) - start > rowSize and rows < height:
+            previous = __unfilter(pending[start], pending[start + 1:start + 1 + rowSize], previous, bpp)
+            strip += previous
+            start += rowSize + 1
+            rows += 1
+        del pending[:start]
+        return bytes(strip)
+
+    while True:
+        chunkHeader = file.read(8)
+        if len(chunkHeader) < 8:
+            raise ValueError("PNG ends before its IEND chunk")
+        length, chunkType = struct.unpack(">I4s", chunkHeader)
+
+        if chunkType == b"IHDR":
+            width, height, bitDepth, colorType, _, _, interlace = struct.unpack(">IIBBBBB", file.read(13))
+            if interlace:
+                raise ValueError("interlaced PNGs can not be read strip-wise")
+            channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}[colorType]
+            rowSize = (width * channels * bitDepth + 7) // 8
+            bpp = max(channels * bitDepth // 8, 1)
+            previous = bytes(rowSize)
+            file.seek(length - 13 + 4, os.SEEK_CUR)  # rest of the chunk and its CRC
+        elif chunkType == b"IDAT":
+            remaining = length
+            while remaining:
+                compressed = file.read(min(remaining, stripSize))
+                if not compressed:
+                    raise ValueError("PNG ends inside an IDAT chunk")
+                remaining -= len(compressed)
+
+                # limiting the output so highly compressed rows are still decompressed a strip at a time
+                while compressed:
+                    pending += decompressor.decompress(compressed, stripSize)
+                    compressed = decompressor.unconsumed_tail
+                    if strip := completeRows():
+                        yield strip
+            file.seek(4, os.SEEK_CUR)
+        elif chunkType == b"IEND":
+            break
+        else:
+            file.seek(length + 4, os.SEEK_CUR)
+
+    pending += decompressor.flush()
+    if strip := completeRows():
+        yield strip
+    if rows != height:
+        raise ValueError(f"PNG holds {rows} of its {height} rows")
+
+
+def __netpbmStrips(file: BinaryIO, stripSize: int) -> Iterator[bytes]:
+    # header of magic, width, height and maximum value separated by whitespace, comments start with #
+    tokens, token = [], b""
+    while len(tokens) < 4:
+        char = file.read(1)
+        if not char:
+            raise ValueError("PGM/PPM ends inside its header")
+        if char == b"#":
+            file.readline()
+        elif char.isspace():
+            if token:
+                tokens.append(token)
+                token = b""
+        else:
+            token += char
+
+    magic, width, height, maxValue = tokens[0], int(tokens[1]), int(tokens[2]), int(tokens[3])
+    if maxValue > 255:
+        raise ValueError("only PGM/PPM images with 8 bits per sample can be read strip-wise")
+
+    remaining = width * height * (3 if magic == b"P6" else 1)
+    while remaining:
+        strip = file.read(min(remaining, stripSize))
+        if not strip:
+            raise ValueError("PGM/PPM ends before its last pixel")
+        remaining -= len(strip)
+        yield strip
+
+
+def readStrips(filepath: str, stripSize: int = 2**20) -> Iterator[bytes]:
+    """reads the pixels of a non interlaced PNG or a binary PGM/PPM image strip by strip without pillow,
+    laid out like the bytes of `Image.tobytes()`. PNGs written by `PngStripWriter` are unfiltered and read at the
+    speed of zlib, the rows other encoders filtered with the Average or Paeth filter are reversed byte by byte.
+
+    Args:
+        filepath (str): path of the image
+        stripSize (int, optional): approximate bytes per strip. Defaults to 1 MiB.
+
+    Raises:
+        ValueError: if the image is not a PNG or PGM/PPM image that can be read strip-wise
+
+    Yields:
+        Iterator[bytes]: the pixels of the image
+    """
+    with open(filepath, "rb") as file:
+        magic = file.read(len(PNG_SIGNATURE))
+        if magic == PNG_SIGNATURE:
+            yield from __pngStrips(file, stripSize)
+        elif magic[:2] in (b"P5", b"P6"):
+            file.seek(0)
+            yield from __netpbmStrips(file, stripSize)
+        else:
+            raise ValueError(f"{filepath} is neither a PNG nor a PGM/PPM image")
+
+
+def stripsToImage(strips: Iterable[bytes], imageDir: str, compressLevel: int = 6) -> str:
+    """strip-wise version of `bytesToImage` for the v2 header written by `imageStrips`, the image is written as the
+    strips arrive. Modes that PNG does not store like pillow (see `PngStripWriter.MODES`) are collected and saved by pillow.
+
+    Args:
+        strips (Iterable[bytes]): the bytes of `imageStrips` without its prefix, split anywhere
+        imageDir (str): directory path to store the image in
+        compressLevel (int, optional): zlib level 0-9 of the PNG. Defaults to 6.
+
+    Returns:
+        str : returns the relative path of the stored decrypted image
+    """
+    strips = iter(strips)
+    header = b""
+    for strip in strips:
+        header += strip
+        if len(header) >= IMAGE_HEADER_V2_SIZE:
+            break
+    if len(header) < IMAGE_HEADER_V2_SIZE:
+        raise ValueError("image data ends inside its header")
+
+    size = byteToSizeV2(header[0:8])
+    mode = str(__removePadding(header[8:16]), "utf-8")
+    pixels = header[IMAGE_HEADER_V2_SIZE:]
+
+    filepath = uniqueFilePath(imageDir, ext=".png")
+    if mode not in PngStripWriter.MODES:
+        from PIL import Image
+
+        pixels += b"".join(strips)
+        with Timing.stage("imageEncode"):
+            Image.frombuffer(mode, size, pixels, "raw", mode, 0, 1).save(filepath)
+        return filepath
+
+    try:
+        with open(filepath, "wb") as file:
+            writer = PngStripWriter(file, size, mode, compressLevel)
+            for strip in chain([pixels], strips):
+                with Timing.stage("imageEncode"):
+                    writer.write(strip)
+            with Timing.stage("imageEncode"):
+                writer.close()
+    except BaseException:
+        os.remove(filepath)
+        raise
     return filepath
+#------------------------------------------STRIP-WISE IMAGES------------------------------------------#
 
 
 # total_time: float = 40
@@ -115,18 +645,21 @@ def bytesToImage(imgData: bytes, imageDir: str) -> str:
 # length_2=1
 # gravity=9.81
 
-def writeKey(keyFileName, total_time, total_samples, theta1_intial, angularVelocity_initial_1, theta2_intial, angularVelocity_initial_2, mass1, mass2, length1, length2, gravity):
+def writeKey(keyFileName, total_time, total_samples, theta1_intial, angularVelocity_initial_1, theta2_intial, angularVelocity_initial_2, mass1, mass2, length1, length2, gravity, derivation=0):
     lines = list(map( str, [
             total_time, total_samples, theta1_intial, angularVelocity_initial_1, 
             theta2_intial, angularVelocity_initial_2, mass1, mass2, length1, length2, gravity
         ] ))
-    with open(keyFileName, "w") as keyFile:
+    if derivation:
+        # keys derived otherwise than by odeint record how, see `KeyCache.deriveMasterKey`
+        lines.append(str(derivation))
+    with Timing.stage("writeKey"), open(keyFileName, "w") as keyFile:
         keyFile.write("\n".join(lines))
         keyFile.close()
 
 
 def readKey(keyFileName: str):
-    with open(keyFileName, "r") as keyFile:
+    with Timing.stage("readKey"), open(keyFileName, "r") as keyFile:
         return list( map(float, keyFile.readlines()) )
 
 
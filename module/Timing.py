@@ -0,0 +1,141 @@
+"""
+Timing reports for the command line scripts and per-stage latency of the requests
+"""
+import bisect
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator
+
+# timings of the stages run while `recordStages` is active, None while nothing records them
+__stageTimings: ContextVar["dict[str, float]|None"] = ContextVar("stageTimings", default=None)
+# functions called with the name and duration in seconds of every stage
+stageHooks: list[Callable[[str, float], None]] = []
+# upper bounds in seconds of the histogram buckets, from 0.1 ms to 100 s
+HISTOGRAM_BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100]
+
+
+def profileStartup(argv: list[str]) -> int:
+    """Runs the script given by `argv` again under `python -X importtime` and prints how long the imports
+    of every top-level package took, including the ones imported lazily while serving the request.
+    The output of the script is passed through unchanged, the report is written to stderr.
+
+    Args:
+        argv (list[str]): script path followed by its arguments (sys.argv without the profiling flag)
+
+    Returns:
+        int: exit code of the script
+    """
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", *argv], stderr=subprocess.PIPE, text=True)
+    wallTime = time.perf_counter() - start
+
+    packages: dict[str, int] = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            sys.stderr.write(line + "\n")  # anything the script itself wrote to stderr
+            continue
+
+        _, cumulative, name = line.split("|")
+        # nested imports are indented and already part of the cumulative time of the import that caused them
+        if not cumulative.strip().isdigit() or name[1:2] == " ":
+            continue
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(cumulative)
+
+    totalImports = sum(packages.values())
+    report = ["import time by top-level package (cumulative):"]
+    for package, microseconds in sorted(packages.items(), key=lambda item: item[1], reverse=True):
+        report.append(f"  {package:<28}{microseconds / 1000:>10.1f} ms")
+    report.append(f"  {'total':<28}{totalImports / 1000:>10.1f} ms of {wallTime * 1000:.1f} ms wall time")
+
+    sys.stderr.write("\n".join(report) + "\n")
+    return process.returncode
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Times the code of the with block as the stage `name` if `recordStages` is active or a hook is in `stageHooks`.
+    Repeated stages add up, nested stages are also counted in the stages around them.
+
+    Args:
+        name (str): name of the stage, e.g. "odeint" or "pngEncode"
+    """
+    timings = __stageTimings.get()
+    if timings is None and not stageHooks:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+        for hook in stageHooks:
+            hook(name, elapsed)
+
+
+@contextmanager
+def recordStages() -> Iterator[dict[str, float]]:
+    """Records the time in seconds spent in every `stage` run inside the with block (in this thread or asyncio task)
+
+    Yields:
+        dict[str, float]: seconds by stage name, filled in as the stages finish
+    """
+    timings: dict[str, float] = {}
+    token = __stageTimings.set(timings)
+    try:
+        yield timings
+    finally:
+        __stageTimings.reset(token)
+
+
+class StageHistograms:
+    """Aggregates stage timings of many requests into one histogram per stage
+
+    Args:
+        buckets (list[float], optional): upper bounds in seconds of the histogram buckets. Defaults to HISTOGRAM_BUCKETS.
+    """
+
+    def __init__(self, buckets: list[float]|None = None) -> None:
+        self.buckets = sorted(buckets or HISTOGRAM_BUCKETS)
+        self.counts: dict[str, list[int]] = {}
+        self.sums: dict[str, float] = {}
+
+    def observe(self, name: str, seconds: float) -> None:
+        """adds one timing of the stage `name`, can be appended to `stageHooks` directly"""
+        if name not in self.counts:
+            self.counts[name] = [0] * (len(self.buckets) + 1)  # the last one counts the timings above every bucket
+            self.sums[name] = 0.0
+        self.counts[name][bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sums[name] += seconds
+
+    def observeAll(self, timings: dict[str, float]) -> None:
+        """adds the timings recorded by `recordStages` for one request"""
+        for name, seconds in timings.items():
+            self.observe(name, seconds)
+
+    def export(self) -> dict[str, dict]:
+        """returns the count, sum and cumulative bucket counts (by upper bound, "+Inf" for all of them) of every stage"""
+        histograms = {}
+        for name, counts in self.counts.items():
+            cumulative, total = {}, 0
+            for bound, count in zip(self.buckets + ["+Inf"], counts):
+                total += count
+                cumulative[str(bound)] = total
+            histograms[name] = {"count": total, "sum": self.sums[name], "buckets": cumulative}
+        return histograms
+
+    def exportPrometheus(self, metric: str = "stage_duration_seconds") -> str:
+        """returns the histograms in the Prometheus text exposition format"""
+        lines = [f"# TYPE {metric} histogram"]
+        for name, histogram in self.export().items():
+            for bound, count in histogram["buckets"].items():
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {histogram["sum"]}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {histogram["count"]}')
+        return "\n".join(lines) + "\n"
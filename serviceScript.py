@@ -0,0 +1,298 @@
+"""
+Asyncio service serving encryption and decryption requests over local HTTP or a unix socket.
+
+    POST /encrypt   {"data_value": "hello", "data_type": "text", "key": <optional>, "compression": <optional>, "deadline": <optional seconds>}
+    POST /decrypt   {"encrypted_image": "<image path>", "key": "<key file or ks:<key store id>>", "deadline": <optional seconds>}
+    GET  /timings   stage histograms of the served requests, as returned by the "timings" action of workerScript.py
+    GET  /status    number of queued and running requests
+
+The request and response bodies are the JSON requests and responses of workerScript.py. The encryption and decryption
+run on a pool of --workers processes fed from a queue of requests, at most --queue-size of which wait for a worker.
+Requests arriving while that many wait are answered right away with 503 and a Retry-After header instead of piling up,
+so a burst keeps --workers processes busy rather than starting a job for every request.
+
+Every request has to be answered within --deadline seconds of its arrival (by default the 2 minutes /uploadText of
+index.js allows), or within its own "deadline" if that is shorter. Requests still queued at their deadline are dropped
+and stop counting against --queue-size right away, those still running are answered with 504 while their worker
+finishes them, as a running process can not be interrupted. A pool broken by a dying worker process is replaced.
+
+    python serviceScript.py --port 8000
+    curl -d '{"data_value": "hello", "data_type": "text"}' localhost:8000/encrypt
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from workerScript import Server, initWorker, preloadModules, serveRequest
+
+# the 2 minutes index.js gives a session between generating its password and /uploadText
+DEFAULT_DEADLINE = 120
+# seconds a client has to send the whole request and its body once it started sending it
+READ_TIMEOUT = 10
+# seconds a connection is kept open without a request before it is closed silently
+KEEP_ALIVE_TIMEOUT = 10
+MAX_BODY_SIZE = 2**20
+ACTIONS = {"/encrypt": "encrypt", "/decrypt": "decrypt"}
+# fields every request of an action must have, see `workerScript.serveRequest`
+REQUIRED_FIELDS = {"encrypt": ("data_value", "data_type"), "decrypt": ("encrypted_image", "key")}
+
+
+class Service:
+    """Queues the requests and serves them on a pool of worker processes, at most `workers` of them at a time
+
+    Args:
+        workers (int): number of worker processes
+        queueSize (int): number of requests waiting for a worker at which new ones are rejected
+        deadline (float): seconds from the arrival of a request to its response
+        timings (bool, optional): add the stage timings to every response. Defaults to False.
+    """
+
+    def __init__(self, workers: int, queueSize: int, deadline: float, timings: bool = False) -> None:
+        self.workers = workers
+        self.deadline = deadline
+        self.server = Server(timings)
+        self.queueSize = queueSize
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.running = 0
+        # futures of the requests waiting for a worker, the queue itself still holds the ones dropped at their deadline
+        self._waiting: set[asyncio.Future] = set()
+        self._executor: ProcessPoolExecutor|None = None
+        self._consumers: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._executor = ProcessPoolExecutor(self.workers, initializer=initWorker)
+        self._consumers = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for consumer in self._consumers:
+            consumer.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+
+        while not self.queue.empty():
+            _, _, future = self.queue.get_nowait()
+            future.cancel()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    async def _consume(self) -> None:
+        # one consumer per worker process, so a request is only taken from the queue once a process is free for it
+        loop = asyncio.get_running_loop()
+        while True:
+            deadline, request, future = await self.queue.get()
+            self._waiting.discard(future)
+            if future.done() or loop.time() >= deadline:
+                continue  # answered with 504 while it was queued
+
+            self.running += 1
+            executor = self._executor
+            try:
+                responseBody = await loop.run_in_executor(executor, serveRequest, request)
+            except Exception as eobj:
+                if isinstance(eobj, BrokenProcessPool):
+                    self._replaceExecutor(executor)
+                if not future.done():
+                    future.set_exception(eobj)
+            else:
+                if not future.done():
+                    future.set_result(responseBody)
+            finally:
+                self.running -= 1
+
+    def _replaceExecutor(self, broken: ProcessPoolExecutor) -> None:
+        # a worker process died (e.g. killed by the OOM killer) and the pool refuses every later request, the consumers
+        # of all its running requests see that, but only the first one replaces it
+        if self._executor is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = ProcessPoolExecutor(self.workers, initializer=initWorker)
+
+    async def submit(self, request: dict, deadline: float|None = None) -> tuple[HTTPStatus, dict]:
+        """queues the request and waits for its response until its deadline
+
+        Args:
+            request (dict): request of workerScript.py
+            deadline (float | None, optional): seconds to answer it in, capped at the deadline of the service. Defaults to None.
+
+        Returns:
+            tuple[HTTPStatus, dict]: status and body of the HTTP response
+        """
+        loop = asyncio.get_running_loop()
+        timeout = self.deadline if deadline is None else min(deadline, self.deadline)
+        future = loop.create_future()
+
+        if len(self._waiting) >= self.queueSize:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"success": False, "message": "Too many requests, try again later"}
+        self._waiting.add(future)
+        self.queue.put_nowait((loop.time() + timeout, request, future))
+
+        try:
+            # cancels the future on timeout, so it is skipped if it is still queued
+            responseBody = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return HTTPStatus.GATEWAY_TIMEOUT, {"success": False, "message": f"Request not served within {timeout} seconds"}
+        except Exception as eobj:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"success": False, "message": f"Exeption ocurred with message {eobj}"}
+        finally:
+            self._waiting.discard(future)  # frees its place right away if it timed out while queued
+
+        return HTTPStatus.OK, self.server.observe(responseBody)
+
+    async def route(self, method: str, path: str, body: bytes) -> tuple[HTTPStatus, dict]:
+        """returns the status and body of the HTTP response to the request"""
+        path = path.split("?", 1)[0]
+
+        if path in ACTIONS:
+            if method != "POST":
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"success": False, "message": f"{path} must be requested with POST"}
+            try:
+                request = json.loads(body)
+                if not isinstance(request, dict):
+                    raise ValueError("must be a JSON object")
+                missing = [field for field in REQUIRED_FIELDS[ACTIONS[path]] if not isinstance(request.get(field), str)]
+                if missing:
+                    raise ValueError(f"{', '.join(missing)} must be given as strings")
+                deadline = request.pop("deadline", None)
+                deadline = None if deadline is None else float(deadline)
+            except (TypeError, ValueError) as eobj:
+                return HTTPStatus.BAD_REQUEST, {"success": False, "message": f"Invalid request: {eobj}"}
+
+            request["action"] = ACTIONS[path]
+            if self.server.timings:
+                request["timings"] = True
+            return await self.submit(request, deadline)
+
+        if path not in ("/timings", "/status"):
+            return HTTPStatus.NOT_FOUND, {"success": False, "message": f"Unknown path {path}"}
+        if method != "GET":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"success": False, "message": f"{path} must be requested with GET"}
+        if path == "/timings":
+            return HTTPStatus.OK, self.server.timingsBody()
+        return HTTPStatus.OK, {
+            "success": True, "queued": len(self._waiting), "running": self.running,
+            "workers": self.workers, "queue_size": self.queueSize
+        }
+
+    async def handleConnection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """serves the HTTP/1.1 requests of a connection one after the other"""
+        try:
+            while True:
+                try:
+                    # an idle keep-alive connection is not a malformed request, it is closed without a response
+                    firstByte = await asyncio.wait_for(reader.read(1), KEEP_ALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not firstByte:
+                    break
+
+                try:
+                    httpRequest = await asyncio.wait_for(readRequest(reader, firstByte), READ_TIMEOUT)
+                except (ValueError, asyncio.TimeoutError) as eobj:
+                    await writeResponse(writer, HTTPStatus.BAD_REQUEST, {"success": False, "message": f"Invalid HTTP request {eobj}"}, False)
+                    break
+                if httpRequest is None:
+                    break
+
+                method, path, keepAlive, body = httpRequest
+                status, responseBody = await self.route(method, path, body)
+                await writeResponse(writer, status, responseBody, keepAlive)
+                if not keepAlive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def readRequest(reader: asyncio.StreamReader, firstByte: bytes = b"") -> tuple[str, str, bool, bytes]|None:
+    """reads the next HTTP request of the connection, None once the client closed it.
+    `firstByte` is the start of the request line if it was already read from the connection
+
+    Raises:
+        ValueError: if the request is malformed or its body is larger than MAX_BODY_SIZE
+
+    Returns:
+        tuple[str, str, bool, bytes] | None: method, path, whether to keep the connection open and body
+    """
+    requestLine = firstByte + await reader.readline()
+    if not requestLine.strip():
+        return None
+
+    method, path, version = requestLine.decode("latin-1").split()
+    headers = {}
+    while (line := await reader.readline()).strip():
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY_SIZE:
+        raise ValueError(f"body larger than {MAX_BODY_SIZE} bytes")
+
+    keepAlive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+    return method, path, keepAlive, await reader.readexactly(length)
+
+
+async def writeResponse(writer: asyncio.StreamWriter, status: HTTPStatus, responseBody: dict, keepAlive: bool) -> None:
+    body = json.dumps(responseBody).encode("utf-8")
+    head = [
+        f"HTTP/1.1 {status.value} {status.phrase}",
+        "Content-Type: application/json",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keepAlive else 'close'}",
+    ]
+    if status == HTTPStatus.SERVICE_UNAVAILABLE:
+        head.append("Retry-After: 1")
+
+    writer.write("\r\n".join(head).encode("latin-1") + b"\r\n\r\n" + body)
+    await writer.drain()
+
+
+async def serve(args: argparse.Namespace) -> None:
+    service = Service(args.workers, args.queue_size, args.deadline, args.timings)
+    service.start()
+
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        server = await asyncio.start_unix_server(service.handleConnection, args.socket)
+    else:
+        server = await asyncio.start_server(service.handleConnection, args.host, args.port)
+
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+
+    try:
+        await stopped.wait()
+    finally:
+        server.close()
+        await service.stop()
+        if args.socket:
+            os.remove(args.socket)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serves encryption and decryption requests over HTTP")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="port to listen on")
+    parser.add_argument("--socket", help="unix socket path to listen on instead of --host and --port")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument("--queue-size", type=int, help="requests waiting for a worker before new ones get 503. Defaults to 4 per worker")
+    parser.add_argument("--deadline", type=float, default=DEFAULT_DEADLINE, help="seconds to answer a request in. Defaults to 120")
+    parser.add_argument("--timings", action="store_true", help="add the time spent in every stage to every response")
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    args.queue_size = args.queue_size or 4 * args.workers
+    if args.queue_size < 1 or args.deadline <= 0:
+        parser.error("--queue-size and --deadline must be positive")
+
+    preloadModules()
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the tests import the `module` namespace package and the scripts from the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
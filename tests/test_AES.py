@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from module import AES
+
+KEY = bytes(range(32))
+
+
+@pytest.mark.parametrize("msg", [b"\x00" * 2**18, os.urandom(2**18 + 5) + b"\x00" * 40, b"", b"\x00"])
+def test_decryptorOnlyHoldsBackTheLastBlock(msg):
+    iv, cipherMsg = AES.encrypt(msg, KEY)
+    decryptor = AES.Decryptor(KEY, iv)
+
+    chunks = []
+    for start in range(0, len(cipherMsg), 4096):
+        chunks.append(decryptor.update(cipherMsg[start:start + 4096]))
+        # everything but the last block is returned right away, even long runs of \x00 bytes
+        assert sum(map(len, chunks)) == min(start + 4096, len(cipherMsg)) - 16
+    chunks.append(decryptor.finalize())
+
+    assert b"".join(chunks) == msg == AES.decrypt(cipherMsg, KEY, iv)
+
+
+def test_decryptorRejectsTruncatedCipherText():
+    iv, cipherMsg = AES.encrypt(b"hello", KEY)
+    decryptor = AES.Decryptor(KEY, iv)
+    decryptor.update(cipherMsg[:-1])
+    with pytest.raises(ValueError):
+        decryptor.finalize()
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_decryptRemovesThePaddingInPlace(workers):
+    msg = os.urandom(3 * 2**16 + 7)
+    iv, cipherMsg = AES.encrypt(msg, KEY)
+
+    decrypted = AES.decrypt(cipherMsg, KEY, iv, workers=workers, chunkSize=2**16)
+    assert isinstance(decrypted, bytearray)
+    assert decrypted == msg
+
+
+def test_removePaddingShrinksBytearraysInPlace():
+    data = bytearray(b"message" + bytes([9]) * 9)
+    assert AES.removePadding(data) is data
+    assert data == b"message"
+
+    # zero padded before PKCS#7 padding was used
+    legacy = bytearray(b"legacy" + b"\x00" * 10000)
+    assert AES.removePadding(legacy) is legacy
+    assert legacy == b"legacy"
+    assert AES.removePadding(bytes(5000)) == b""
+
+    with pytest.raises(ValueError):
+        AES.removePadding(bytearray(b"message" + bytes([3]) * 2))
+
+
+def test_decryptIsSerialUnlessAskedForThreads(monkeypatch):
+    # the pools of worker processes call it with its default and already use every CPU
+    def noThreads(*args, **kwargs):
+        raise AssertionError("decrypt started a thread pool")
+
+    msg = os.urandom(3 * 2**20)
+    iv, cipherMsg = AES.encrypt(msg, KEY)
+    monkeypatch.setattr(AES, "ThreadPoolExecutor", noThreads)
+    assert AES.decrypt(cipherMsg, KEY, iv) == msg
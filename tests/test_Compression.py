@@ -0,0 +1,81 @@
+import random
+
+import pytest
+from PIL import Image
+
+from module import AES, Compression, Handlers, KeyCache, Support
+
+
+def availableCodecs() -> list[str]:
+    codecs = []
+    for codec in Compression.CODECS:
+        try:
+            Compression.checkCodec(codec)
+        except ValueError:  # lz4 is optional
+            continue
+        codecs.append(codec)
+    return codecs
+
+
+@pytest.fixture
+def keyFile(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("KEY_CACHE_DIR", str(tmp_path / "keyCache"))
+    Support.writeKey("key", 40, 1001, 1, -3, -1, 5, 2, 1, 2, 1, 9.81)
+    return "key"
+
+
+def typeByte(responseBody: dict, keyFile: str) -> int:
+    masterKey = KeyCache.KeyCache().masterKey(Support.readKey(keyFile))
+    return AES.decryptFromImage(responseBody["filepath"], masterKey)[0]
+
+
+@pytest.mark.parametrize("codec", availableCodecs())
+def test_codecsRoundTripThroughRequests(codec, keyFile):
+    text = "compressible text " * 500
+    responseBody = Handlers.encryptRequest(text, "text", keyFile, compression=codec, compressionLevel=1)
+    assert responseBody["success"], responseBody
+    # the codec in the upper 4 bits, the data type (0 for text) in the lower ones
+    assert typeByte(responseBody, keyFile) == Compression.CODECS[codec] << 4
+
+    responseBody = Handlers.decryptRequest(responseBody["filepath"], keyFile)
+    assert responseBody == {"data": str(bytes([0]) + bytes(text, "utf-8")), "success": True}
+
+    Image.linear_gradient("L").save("gradient.png")
+    responseBody = Handlers.encryptRequest("gradient.png", "image", keyFile, compression=codec)
+    assert typeByte(responseBody, keyFile) == Compression.CODECS[codec] << 4 | 1
+    responseBody = Handlers.decryptRequest(responseBody["filepath"], keyFile)
+    with Image.open(responseBody["filepath"]) as decrypted, Image.open("gradient.png") as original:
+        assert decrypted.tobytes() == original.tobytes()
+
+
+def test_incompressiblePayloadsAreStoredUncompressed(keyFile):
+    noise = Image.frombytes("L", (64, 64), random.Random(0).randbytes(64 * 64))
+    noise.save("noise.png")
+
+    responseBody = Handlers.encryptRequest("noise.png", "image", keyFile, compression="zlib")
+    assert typeByte(responseBody, keyFile) == 1
+    responseBody = Handlers.decryptRequest(responseBody["filepath"], keyFile)
+    with Image.open(responseBody["filepath"]) as decrypted:
+        assert decrypted.tobytes() == noise.tobytes()
+
+
+def test_compressionHasToSaveMinSaving():
+    data = random.Random(0).randbytes(1000)
+    assert Compression.compress(data, "zlib") == (0, data)
+
+    # saves about MIN_SAVING / 2, short of the threshold
+    almost = random.Random(0).randbytes(1000) + bytes(int(1000 * Compression.MIN_SAVING / 2))
+    assert Compression.compress(almost, "zlib")[0] == 0
+
+
+def test_largePayloadsAreJudgedOnTheirMiddleSample():
+    size = 4 * Compression.SAMPLE_SIZE
+    # compressible everywhere but around the middle, which is all the sample sees
+    data = bytes(size) + random.Random(0).randbytes(size // 2) + bytes(size)
+    middle = len(data) // 2
+    assert size <= middle and middle + Compression.SAMPLE_SIZE <= size + size // 2
+    assert Compression.compress(data, "zlib") == (0, data)
+
+    codecId, compressed = Compression.compress(bytes(size), "zlib")
+    assert codecId == Compression.CODECS["zlib"] and Compression.decompress(compressed, codecId) == bytes(size)
@@ -0,0 +1,85 @@
+import random
+import warnings
+
+import numpy as np
+import pytest
+from scipy.integrate import ODEintWarning, odeint
+
+from module import DoublePendulum
+
+
+def randomParams(rng: random.Random) -> list[float]:
+    """initial conditions in the ranges of `Support.generateInitialConditions`, in the order written by `Support.writeKey`"""
+    pi = np.pi
+    return [
+        rng.randint(40, 100), rng.randint(4, 1000),
+        rng.random() * 2 * pi - pi, rng.random() * 10 * pi - 5 * pi,
+        rng.random() * 2 * pi - pi, rng.random() * 10 * pi - 5 * pi,
+        rng.random() * 9 + 1, rng.random() * 9 + 1,
+        rng.random() * 3 + 1, rng.random() * 3 + 1,
+        rng.random() * 2 + 8,
+    ]
+
+
+def solve(dSdt, params: list[float], t: np.ndarray) -> tuple[np.ndarray, bool]:
+    """integrates like `getCoordinates`, returns the states and whether odeint succeeded"""
+    _, _, the1, z1, the2, z2, m1, m2, L1, L2, g = params
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", ODEintWarning)
+        ans, info = odeint(dSdt, y0=[the1, z1, the2, z2], t=t, args=(g, m1, m2, L1, L2), full_output=True)
+    return ans, info["message"] == "Integration successful."
+
+
+@pytest.fixture(scope="module")
+def symbolicDSdt():
+    dz1dt_f, dz2dt_f = DoublePendulum.deriveEquations()
+
+    def dSdt(S, t, g, m1, m2, L1, L2):
+        the1, z1, the2, z2 = S
+        return [z1, dz1dt_f(t, g, m1, m2, L1, L2, the1, the2, z1, z2), z2, dz2dt_f(t, g, m1, m2, L1, L2, the1, the2, z1, z2)]
+
+    return dSdt
+
+
+def test_getCoordinatesMatchesSymbolicDerivation(symbolicDSdt):
+    rng = random.Random(1)
+    compared = 0
+    for params in [[40, 1001, 1, -3, -1, 5, 2, 1, 2, 1, 9.81]] + [randomParams(rng) for _ in range(8)]:
+        total_time, total_samples, the1, z1, the2, z2, m1, m2, L1, L2, g = params
+        ans, success = solve(symbolicDSdt, params, np.linspace(0, total_time, int(total_samples)))
+        if not success:
+            continue  # odeint returns uninitialised memory after "excess work", which differs between any two runs
+
+        x1, y1, x2, y2 = DoublePendulum.getCoordinates(*params)
+        the1s, the2s = ans.T[0], ans.T[2]
+        assert np.array_equal(x1, L1 * np.sin(the1s))
+        assert np.array_equal(y1, -L1 * np.cos(the1s))
+        assert np.array_equal(x2, L1 * np.sin(the1s) + L2 * np.sin(the2s))
+        assert np.array_equal(y2, -L1 * np.cos(the1s) - L2 * np.cos(the2s))
+        compared += 1
+
+    assert compared >= 5
+
+
+def test_sampledCoordinatesGiveTheKeysOfTheFullOutput():
+    from module import AES, KeyCache
+
+    rng = random.Random(3)
+    compared = 0
+    for _ in range(12):
+        params = randomParams(rng)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always", ODEintWarning)
+            x1, y1, x2, y2 = DoublePendulum.getCoordinates(*params)
+        if caught:
+            continue  # the full output itself differs between runs after "excess work"
+
+        sampleIndices = AES.keySampleIndices(int(params[1]))
+        sampled = DoublePendulum.getCoordinates(*params, sample_indices=sampleIndices)
+        for full, samples in zip((x1, y1, x2, y2), sampled):
+            assert np.array_equal(full[sampleIndices], samples)
+        # positionally as the original encryptionScript.py did: x1, x2, y1, y2 = getCoordinates(...)
+        assert KeyCache.deriveMasterKey(params) == AES.masterKey(x1, y1, x2, y2)
+        compared += 1
+
+    assert compared >= 8
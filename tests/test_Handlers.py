@@ -0,0 +1,45 @@
+from module import Handlers, KeyStore
+
+
+def test_storedKeysNeedTheirPrefix(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with KeyStore.KeyStore(str(tmp_path / "keys.dpks")) as keyStore:
+        keyName = Handlers.newKey(keyStore)
+        assert keyName == "ks:0"
+        assert Handlers.isStoredKey(keyName, keyStore)
+        assert Handlers.readKeyParams(keyName, keyStore) == keyStore.get(0)
+
+        # a key file named by digits alone stays a key file
+        (tmp_path / "0").write_text("\n".join(["40", "1001", "1", "-3", "-1", "5", "2", "1", "2", "1", "9.81"]))
+        assert not Handlers.isStoredKey("0", keyStore)
+        assert Handlers.readKeyParams("0", keyStore) == [40, 1001, 1, -3, -1, 5, 2, 1, 2, 1, 9.81]
+        assert not Handlers.isStoredKey("ks:1", keyStore)
+
+
+def test_keyStoreLocksWithoutImportingFcntlUpFront():
+    # fcntl does not exist on Windows, it is only imported once a store is locked
+    assert "fcntl" not in vars(KeyStore)
+
+
+def test_unknownCodecIsRejectedBeforeAKeyIsGenerated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    responseBody = Handlers.encryptRequest("hello", "text", compression="nope")
+    assert not responseBody["success"] and "unknown codec" in responseBody["message"]
+    assert not (tmp_path / Handlers.KEY_DIR).exists()
+
+
+def test_keysGeneratedInTheSameTickNeverCollide(tmp_path, monkeypatch):
+    from datetime import datetime
+
+    from module import Support
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2024, 1, 1)
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(Support, "datetime", FrozenDatetime)
+    keyFileNames = [Handlers.newKey() for _ in range(2)]
+    assert keyFileNames[0] != keyFileNames[1]
+    assert Support.readKey(keyFileNames[0]) != Support.readKey(keyFileNames[1])
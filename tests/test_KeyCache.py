@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from module import KeyCache, KeyStore, Support
+from tests.test_DoublePendulum import randomParams
+
+
+@pytest.fixture
+def batchKeys():
+    rng = random.Random(2)
+    paramsList = [randomParams(rng) for _ in range(3)]
+    for params in paramsList:
+        params[0], params[1] = 4, 101  # short integrations, the derivation does not depend on them
+    return KeyCache.deriveMasterKeysBatch(paramsList)
+
+
+def test_batchKeysAreRederivedFromTheirParams(batchKeys):
+    paramsList, keys = batchKeys
+
+    for params, key in zip(paramsList, keys):
+        assert params[11] == KeyCache.BATCH_DERIVATION
+        assert KeyCache.deriveMasterKey(params) == key
+        # the same params without their derivation are integrated by odeint
+        assert KeyCache.deriveMasterKey(params[:11]) != key
+
+
+def test_batchKeysRoundTripThroughKeyFilesAndStores(batchKeys, tmp_path):
+    paramsList, keys = batchKeys
+
+    Support.writeKey(tmp_path / "key", *paramsList[0][:11], derivation=paramsList[0][11])
+    assert KeyCache.deriveMasterKey(Support.readKey(tmp_path / "key")) == keys[0]
+
+    with KeyStore.KeyStore(str(tmp_path / "keys.dpks")) as keyStore:
+        batchIds = keyStore.addMany(paramsList)
+        odeintId = keyStore.add(paramsList[0][:11])
+        assert [KeyCache.deriveMasterKey(keyStore.get(keyId)) for keyId in batchIds] == keys
+        assert keyStore.get(odeintId) == paramsList[0][:11]
+
+
+def test_unknownDerivationIsRejected():
+    with pytest.raises(ValueError):
+        KeyCache.deriveMasterKey([40, 1001, 1, 1, 1, 1, 1, 1, 1, 1, 9.81, 7])
@@ -0,0 +1,51 @@
+import struct
+
+import pytest
+
+from module import Handlers, KeyCache, KeyStore, Support
+
+PARAMS = [[40.0, 1001.0, 1.0, -3.0, -1.0, 5.0, 2.0, 1.0, 2.0, 1.0, 9.81], [60.0, 500.0, 0.5, 2.0, -0.5, 1.0, 3.0, 4.0, 1.5, 2.5, 9.0]]
+
+
+def writeVersion1Store(path) -> None:
+    """a key store as written before the derivation was recorded: 11 doubles per record"""
+    header = struct.pack("<4sHH8x", b"DPKS", 1, 11 * 8)
+    path.write_bytes(header + b"".join(struct.pack("<11d", *params) for params in PARAMS))
+
+
+def test_version1StoresAreStillRead(tmp_path):
+    writeVersion1Store(tmp_path / "v1.dpks")
+
+    with KeyStore.KeyStore(str(tmp_path / "v1.dpks")) as keyStore:
+        assert len(keyStore) == 2
+        assert [keyStore.get(0), keyStore.get(1)] == PARAMS
+        assert Handlers.readKeyParams("ks:1", keyStore) == PARAMS[1]
+
+        # keys derived by odeint are still appended as version 1 records, batch-derived ones can not be stored
+        assert keyStore.add(PARAMS[0]) == 2
+        assert keyStore.get(2) == PARAMS[0]
+        with pytest.raises(ValueError):
+            keyStore.add(PARAMS[0] + [KeyCache.BATCH_DERIVATION])
+
+    assert (tmp_path / "v1.dpks").stat().st_size == 16 + 3 * 11 * 8
+
+
+def test_otherFilesAreRejected(tmp_path):
+    (tmp_path / "other").write_bytes(struct.pack("<4sHH8x", b"DPKS", 3, 96))
+    with pytest.raises(ValueError):
+        KeyStore.KeyStore(str(tmp_path / "other"))
+
+
+def test_importKeyFiles(tmp_path):
+    keyFileNames = []
+    for index, params in enumerate(PARAMS):
+        keyFileNames.append(str(tmp_path / f"key_{index}"))
+        Support.writeKey(keyFileNames[-1], *params, derivation=index * KeyCache.BATCH_DERIVATION)
+
+    with KeyStore.KeyStore(str(tmp_path / "keys.dpks")) as keyStore:
+        keyStore.add(PARAMS[1])
+        keyIds = keyStore.importKeyFiles(keyFileNames)
+
+        assert keyIds == {keyFileNames[0]: 1, keyFileNames[1]: 2}
+        assert keyStore.get(1) == PARAMS[0]
+        assert keyStore.get(2) == PARAMS[1] + [KeyCache.BATCH_DERIVATION]
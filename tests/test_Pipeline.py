@@ -0,0 +1,67 @@
+import io
+import random
+
+import pytest
+from PIL import Image
+
+from module import Handlers, KeyCache, Pipeline, Support
+
+KEY = bytes(range(32))
+
+
+@pytest.fixture
+def image() -> Image.Image:
+    return Image.frombytes("RGB", (40, 30), random.Random(0).randbytes(40 * 30 * 3))
+
+
+@pytest.mark.parametrize("options", [{}, {"compression": "zlib"}, {"format": "PPM"}])
+def test_textRoundTrip(options):
+    encrypted = Pipeline.encryptText("hello pipeline " * 100, KEY, **options)
+    decrypted = Pipeline.decrypt(encrypted, KEY)
+    assert decrypted.data_type == "text" and decrypted.value == "hello pipeline " * 100
+    with pytest.raises(ValueError):
+        decrypted.encode()
+
+
+def test_imageRoundTrip(image, tmp_path):
+    encodedPng = io.BytesIO()
+    image.save(encodedPng, format="PNG")
+
+    # the image itself, the bytes of its file and a file-like object give the same pixels
+    for source in (image, encodedPng.getvalue(), io.BytesIO(encodedPng.getvalue())):
+        decrypted = Pipeline.decrypt(io.BytesIO(Pipeline.encryptImage(source, KEY)), KEY, workers=2)
+        assert decrypted.data_type == "image"
+        assert decrypted.value.mode == image.mode and decrypted.value.tobytes() == image.tobytes()
+
+    with Image.open(io.BytesIO(decrypted.encode())) as reencoded:
+        assert reencoded.tobytes() == image.tobytes()
+    with Image.open(decrypted.save(str(tmp_path))) as saved:
+        assert saved.tobytes() == image.tobytes()
+
+
+def test_imageFileRoundTrip(image, tmp_path):
+    encodedJpeg = io.BytesIO()
+    image.save(encodedJpeg, format="JPEG")
+
+    decrypted = Pipeline.decrypt(Pipeline.encryptImageFile(encodedJpeg.getvalue(), "jpg", KEY), KEY)
+    assert decrypted.data_type == "image_file" and decrypted.ext == "jpg"
+    assert decrypted.value == decrypted.encode() == encodedJpeg.getvalue()
+
+    filepath = decrypted.save(str(tmp_path))
+    assert filepath.endswith(".jpg")
+    with open(filepath, "rb") as file:
+        assert file.read() == encodedJpeg.getvalue()
+
+
+def test_imagesOfTheRequestHandlersAreDecrypted(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("KEY_CACHE_DIR", str(tmp_path / "keyCache"))
+    Support.writeKey("key", 40, 1001, 1, -3, -1, 5, 2, 1, 2, 1, 9.81)
+    masterKey = KeyCache.KeyCache().masterKey(Support.readKey("key"))
+
+    responseBody = Handlers.encryptRequest("from the handlers", "text", "key")
+    with open(responseBody["filepath"], "rb") as encrypted:
+        assert Pipeline.decrypt(encrypted, masterKey).value == "from the handlers"
+
+    Image.open(io.BytesIO(Pipeline.encryptText("from the pipeline", masterKey))).save("pipeline.png")
+    assert Handlers.decryptRequest("pipeline.png", "key")["data"] == str(b"\x00from the pipeline")
@@ -0,0 +1,122 @@
+import io
+import os
+import random
+import struct
+import zlib
+
+import pytest
+from PIL import Image
+
+from module import Handlers, Support
+
+
+def randomImage(mode: str, size: tuple[int, int], seed: int = 0) -> Image.Image:
+    data = random.Random(seed).randbytes(len(Image.new(mode, size).tobytes()))
+    return Image.frombytes(mode, size, data)
+
+
+@pytest.mark.parametrize("mode", list(Support.PngStripWriter.MODES))
+def test_pngStripWriterRoundTrip(mode, tmp_path):
+    img = randomImage(mode, (37, 23))
+    pixels = img.tobytes()
+    filepath = str(tmp_path / "strips.png")
+
+    with open(filepath, "wb") as file:
+        writer = Support.PngStripWriter(file, img.size, mode)
+        # split anywhere, also inside rows
+        for start in range(0, len(pixels), 100):
+            writer.write(pixels[start:start + 100])
+        writer.close()
+
+    with Image.open(filepath) as written:
+        # pillow opens 16 bit PNGs as "I;16", the same values in little endian
+        assert written.size == img.size and written.tobytes("raw", mode) == pixels
+    assert b"".join(Support.readStrips(filepath, stripSize=64)) == pixels
+
+
+def test_pngStripWriterRejectsMissingRows():
+    writer = Support.PngStripWriter(io.BytesIO(), (4, 4), "L")
+    writer.write(bytes(12))
+    with pytest.raises(ValueError):
+        writer.close()
+
+
+@pytest.mark.parametrize("mode", ["L", "RGB", "RGBA", "LA"])
+def test_readStripsUnfiltersPillowPngs(mode, tmp_path):
+    # noise next to gradients makes pillow's adaptive filtering pick several filter types
+    img = randomImage(mode, (64, 48), seed=1)
+    gradient = Image.linear_gradient("L").resize((64, 24)).convert(mode)
+    img.paste(gradient, (0, 0))
+    filepath = str(tmp_path / "pillow.png")
+    img.save(filepath, optimize=False)
+
+    assert b"".join(Support.readStrips(filepath, stripSize=200)) == img.tobytes()
+
+
+def paeth(a: int, b: int, c: int) -> int:
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    return a if pa <= pb and pa <= pc else b if pb <= pc else c
+
+
+def filterRow(filterType: int, row: bytes, previous: bytes, bpp: int) -> bytes:
+    """the PNG filter `filterType` of the specification applied to a row"""
+    filtered = bytearray()
+    for i, x in enumerate(row):
+        a = row[i - bpp] if i >= bpp else 0
+        b = previous[i]
+        c = previous[i - bpp] if i >= bpp else 0
+        predictor = (0, a, b, (a + b) // 2, paeth(a, b, c))[filterType]
+        filtered.append((x - predictor) % 256)
+    return bytes(filtered)
+
+
+def test_readStripsUnfiltersEveryFilterType(tmp_path):
+    # pillow never picks some filter types, so the rows of this RGB image cycle through all five of them
+    img = randomImage("RGB", (19, 15), seed=3)
+    rowSize, bpp = 19 * 3, 3
+    pixels = img.tobytes()
+
+    raw, previous = bytearray(), bytes(rowSize)
+    for y in range(img.height):
+        row = pixels[y * rowSize:(y + 1) * rowSize]
+        raw += bytes([y % 5]) + filterRow(y % 5, row, previous, bpp)
+        previous = row
+
+    def chunk(chunkType: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + chunkType + data + struct.pack(">I", zlib.crc32(chunkType + data))
+
+    filepath = tmp_path / "filtered.png"
+    filepath.write_bytes(
+        Support.PNG_SIGNATURE + chunk(b"IHDR", struct.pack(">IIBBBBB", 19, 15, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(bytes(raw))) + chunk(b"IEND", b"")
+    )
+
+    with Image.open(filepath) as decoded:
+        assert decoded.tobytes() == pixels
+    assert b"".join(Support.readStrips(str(filepath), stripSize=100)) == pixels
+
+
+def test_sizeHeaderV2HoldsSidesBeyond65535():
+    size = (70000, 3)
+    assert len(Support.sizeToByteV2(size)) == 8
+    assert Support.byteToSizeV2(Support.sizeToByteV2(size)) == size
+
+
+def test_wideImageRoundTripThroughTheV2Header(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("KEY_CACHE_DIR", str(tmp_path / "keyCache"))
+    img = randomImage("RGB", (70000, 3), seed=2)
+    img.save("wide.ppm")
+
+    length, strips = Support.imageStrips("wide.ppm", prefix=bytes([3]), stripSize=2**16)
+    data = b"".join(strips)
+    assert len(data) == length and Support.byteToSizeV2(data[1:9]) == img.size
+
+    responseBody = Handlers.encryptRequest("wide.ppm", "image")
+    assert responseBody["success"], responseBody
+    responseBody = Handlers.decryptRequest(responseBody["filepath"], responseBody["key"])
+    assert responseBody["success"], responseBody
+    with Image.open(responseBody["filepath"]) as decrypted:
+        assert decrypted.size == img.size and decrypted.tobytes() == img.tobytes()
+    assert os.path.dirname(responseBody["filepath"]) == Handlers.DECRYTED_IMAGE_DIR
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import signal
+from http import HTTPStatus
+
+import pytest
+
+import serviceScript
+from serviceScript import Service
+
+
+@pytest.fixture
+def encryptRequest(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("KEY_CACHE_DIR", str(tmp_path / "keyCache"))
+    return lambda: {"action": "encrypt", "data_value": "hello", "data_type": "text"}
+
+
+def test_brokenPoolIsReplaced(encryptRequest):
+    async def run():
+        service = Service(1, 1, 60)
+        service.start()
+        try:
+            request = asyncio.create_task(service.submit(encryptRequest()))
+            while not service.running:
+                await asyncio.sleep(0.01)
+            for pid in list(service._executor._processes):
+                os.kill(pid, signal.SIGKILL)
+
+            assert (await request)[0] == HTTPStatus.INTERNAL_SERVER_ERROR
+            status, responseBody = await service.submit(encryptRequest())
+            assert status == HTTPStatus.OK and responseBody["success"]
+        finally:
+            await service.stop()
+
+    asyncio.run(run())
+
+
+def test_requestsDroppedAtTheirDeadlineFreeTheirPlace(encryptRequest):
+    async def run():
+        service = Service(1, 1, 60)
+        service.start()
+        try:
+            running = asyncio.create_task(service.submit(encryptRequest()))
+            while not service.running:
+                await asyncio.sleep(0.01)
+
+            assert (await service.submit(encryptRequest(), deadline=0.05))[0] == HTTPStatus.GATEWAY_TIMEOUT
+            assert (await service.route("GET", "/status", b""))[1]["queued"] == 0
+            assert (await service.submit(encryptRequest()))[0] == HTTPStatus.OK
+            assert (await running)[0] == HTTPStatus.OK
+        finally:
+            await service.stop()
+
+    asyncio.run(run())
+
+
+def exchange(monkeypatch, data: bytes) -> bytes:
+    """sends `data` to a service without workers and returns everything it answers until it closes the connection"""
+    monkeypatch.setattr(serviceScript, "KEEP_ALIVE_TIMEOUT", 0.2)
+    monkeypatch.setattr(serviceScript, "READ_TIMEOUT", 0.2)
+
+    async def run():
+        service = Service(1, 1, 60)
+        server = await asyncio.start_server(service.handleConnection, "127.0.0.1", 0)
+        try:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            writer.write(data)
+            response = await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+            return response
+        finally:
+            server.close()
+
+    return asyncio.run(run())
+
+
+def test_idleConnectionIsClosedWithoutResponse(monkeypatch):
+    assert exchange(monkeypatch, b"") == b""
+    # after answering a request the connection is kept alive and then closed silently as well
+    response = exchange(monkeypatch, b"GET /status HTTP/1.1\r\n\r\n")
+    assert response.startswith(b"HTTP/1.1 200 OK") and response.count(b"HTTP/1.1") == 1
+
+
+def test_stalledRequestIsAnsweredWith400(monkeypatch):
+    assert exchange(monkeypatch, b"GET /sta").startswith(b"HTTP/1.1 400 Bad Request")
+
+
+def test_requestsWithoutRequiredFieldsAreRejected(monkeypatch):
+    body = b'{"data_type": "text"}'
+    response = exchange(monkeypatch, b"POST /encrypt HTTP/1.1\r\nConnection: close\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+    assert response.startswith(b"HTTP/1.1 400 Bad Request") and b"data_value" in response
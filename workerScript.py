@@ -0,0 +1,180 @@
+"""
+Resident worker serving encryption and decryption requests as JSON lines, so that the imports and the
+master key cache stay warm across requests instead of starting a new interpreter for every one of them.
+
+Requests (one JSON object per line):
+    {"id": 1, "action": "encrypt", "data_value": "hello", "data_type": "text", "key": "<optional key file>",
+     "compression": "<optional codec of module/Compression.py>", "compression_level": <optional level>}
+    {"id": 2, "action": "decrypt", "encrypted_image": "<image path>", "key": "<key file or ks:<key store id>>"}
+    {"id": 3, "action": "timings"}
+
+Requests with "timings": true (every request with --timings) get the milliseconds spent in every stage added to their
+response as "timings". These are aggregated into histograms per stage, returned by the "timings" action as
+{"histograms": {...}} along with the same histograms in the Prometheus text format as "prometheus".
+
+Responses are the response bodies of encryptionScript.py and decryptionScript.py as JSON lines along with the request "id".
+Over stdin the responses are written to stdout in the order they complete, over a unix socket every connection
+gets its responses in the order of its requests.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socketserver
+import sys
+import threading
+from module import Handlers, KeyCache, KeyStore, Timing
+
+keyCache = None
+keyStore = None
+
+
+def initWorker() -> None:
+    global keyCache, keyStore
+    keyCache = KeyCache.KeyCache.fromEnvironment()
+    keyStore = KeyStore.KeyStore.fromEnvironment()
+
+
+def preloadModules() -> None:
+    """the modules only import their heavy dependencies when first used, importing them before creating the pool
+    means that with the fork start method every worker is created with them already loaded"""
+    import numpy, scipy.integrate, PIL.Image, Crypto.Cipher.AES  # noqa: F401
+
+
+def serveRequest(request: dict) -> dict:
+    """serves a single request inside a worker process"""
+    action = request.get("action")
+    # the handlers are called through Handlers.timeRequest to add the timings of their stages
+    call = Handlers.timeRequest if request.get("timings") else lambda handler, *args: handler(*args)
+    try:
+        if action == "encrypt":
+            responseBody = call(
+                Handlers.encryptRequest, request["data_value"], request["data_type"], request.get("key"), keyCache, keyStore,
+                request.get("compression"), request.get("compression_level")
+            )
+        elif action == "decrypt":
+            responseBody = call(Handlers.decryptRequest, request["encrypted_image"], request["key"], keyCache, keyStore)
+        else:
+            responseBody = {"success": False, "message": f"Unknown action {action}"}
+    except Exception as eobj:
+        responseBody = {"success": False, "message": f"Exeption ocurred with message {eobj}"}
+
+    responseBody["id"] = request.get("id")
+    return responseBody
+
+
+class Server:
+    """parses the requests and aggregates the stage timings of their responses in the main process
+
+    Args:
+        timings (bool, optional): add the stage timings to every response. Defaults to False.
+    """
+
+    def __init__(self, timings: bool = False) -> None:
+        self.timings = timings
+        self.histograms = Timing.StageHistograms()
+        self.lock = threading.Lock()
+
+    def parseRequest(self, line: str) -> tuple[dict|None, dict|None]:
+        """returns the parsed request to pass to the workers or the response body to answer the line with directly"""
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as eobj:
+            return None, {"success": False, "message": f"Invalid request: {eobj}", "id": None}
+
+        if not isinstance(request, dict):
+            return None, {"success": False, "message": "Invalid request: must be a JSON object", "id": None}
+
+        if request.get("action") == "timings":
+            return None, {**self.timingsBody(), "id": request.get("id")}
+
+        if self.timings:
+            request["timings"] = True
+        return request, None
+
+    def timingsBody(self) -> dict:
+        """returns the response body of the "timings" action"""
+        with self.lock:
+            return {"success": True, "histograms": self.histograms.export(), "prometheus": self.histograms.exportPrometheus()}
+
+    def observe(self, responseBody: dict) -> dict:
+        """adds the stage timings of the response to the histograms"""
+        if "timings" in responseBody:
+            with self.lock:
+                self.histograms.observeAll({name: milliseconds / 1000 for name, milliseconds in responseBody["timings"].items()})
+        return responseBody
+
+
+def serveStdin(pool, server: Server) -> None:
+    lock = threading.Lock()
+
+    def respond(responseBody: dict) -> None:
+        server.observe(responseBody)
+        with lock:
+            sys.stdout.write(json.dumps(responseBody) + "\n")
+            sys.stdout.flush()
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+
+        request, error = server.parseRequest(line)
+        if error:
+            respond(error)
+        else:
+            pool.apply_async(serveRequest, (request,), callback=respond)
+
+    pool.close()
+    pool.join()
+
+
+def serveSocket(pool, server: Server, socketPath: str) -> None:
+    class RequestHandler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+
+                request, responseBody = server.parseRequest(line.decode("utf-8"))
+                if request is not None:
+                    responseBody = server.observe(pool.apply(serveRequest, (request,)))
+                self.wfile.write(json.dumps(responseBody).encode("utf-8") + b"\n")
+
+    if os.path.exists(socketPath):
+        os.remove(socketPath)
+
+    # stopping on SIGTERM the same way as on Ctrl+C so the socket file gets removed
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    with socketserver.ThreadingUnixStreamServer(socketPath, RequestHandler) as socketServer:
+        socketServer.daemon_threads = True
+        try:
+            socketServer.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socketPath)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serves encryption and decryption requests as JSON lines")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of pre-forked worker processes")
+    parser.add_argument("--socket", help="unix socket path to listen on instead of stdin/stdout")
+    parser.add_argument("--timings", action="store_true", help="add the time spent in every stage to every response")
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    preloadModules()
+    server = Server(args.timings)
+    with multiprocessing.Pool(args.workers, initializer=initWorker) as pool:
+        if args.socket:
+            serveSocket(pool, server, args.socket)
+        else:
+            serveStdin(pool, server)
+
+
+if __name__ == "__main__":
+    main()